@@ -1,7 +1,7 @@
 from django.contrib.auth.forms import UserChangeForm, UserCreationForm
-from django.forms import EmailField
+from django.forms import CharField, EmailField, Form
 
-from .models import User
+from .models import User, validate_timezone
 
 
 class CustomUserCreationForm(UserCreationForm):
@@ -15,4 +15,8 @@ class CustomUserCreationForm(UserCreationForm):
 class CustomUserChangeForm(UserChangeForm):
     class Meta:
         model = User
-        fields = UserChangeForm.Meta.fields
\ No newline at end of file
+        fields = UserChangeForm.Meta.fields
+
+
+class UserTimezoneForm(Form):
+    timezone = CharField(max_length=63, validators=[validate_timezone])
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 02:09
+
+import accounts.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='timezone',
+            field=models.CharField(blank=True, max_length=63, validators=[accounts.models.validate_timezone]),
+        ),
+    ]
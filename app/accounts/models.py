@@ -1,5 +1,16 @@
+import pytz
 from django.contrib.auth.models import AbstractUser
+from django.core.exceptions import ValidationError
+from django.db import models
+
+
+def validate_timezone(value):
+    if value not in pytz.all_timezones_set:
+        raise ValidationError(f'{value} is not a known timezone')
 
 
 class User(AbstractUser):
-    pass
+    # IANA name reported by the browser or detected by the IP address
+    timezone = models.CharField(
+        max_length=63, blank=True, validators=[validate_timezone]
+    )
@@ -33,3 +33,42 @@ class SignupViewTestCase(TestCase):
         new_user = get_user_model().objects.last()
         self.assertEqual(new_user.username, self.signup_form['username'])
         self.assertEqual(new_user.email, self.signup_form['email'])
+
+
+class UserTimezoneViewTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='testuser')
+        self.client.force_login(self.user)
+
+    def test_saves_timezone(self):
+        response = self.client.post(
+            reverse('user_timezone'), {'timezone': 'Europe/Paris'}
+        )
+        self.assertEqual(response.status_code, 204)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.timezone, 'Europe/Paris')
+        self.assertEqual(self.client.session['user_timezone'], 'Europe/Paris')
+
+    def test_anonymous_user(self):
+        self.client.logout()
+        response = self.client.post(
+            reverse('user_timezone'), {'timezone': 'Europe/Paris'}
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.session['user_timezone'], 'Europe/Paris')
+
+    def test_invalid_timezone(self):
+        response = self.client.post(
+            reverse('user_timezone'), {'timezone': 'Not/A_Timezone'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.timezone, '')
+
+    def test_post_only(self):
+        response = self.client.get(reverse('user_timezone'))
+        self.assertEqual(response.status_code, 405)
+
+    def test_beacon_is_rendered(self):
+        response = self.client.get(reverse('login'))
+        self.assertContains(response, reverse('user_timezone'))
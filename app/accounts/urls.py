@@ -5,5 +5,8 @@ from . import views
 
 urlpatterns = [
     path('signup/', views.SignupView.as_view(), name='signup'),
+    path(
+        'timezone/', views.UserTimezoneView.as_view(), name='user_timezone'
+    ),
     path('', include('django.contrib.auth.urls')),
 ]
\ No newline at end of file
@@ -1,11 +1,30 @@
 from audioop import reverse
-from django.views.generic.edit import CreateView
+from django.http import HttpResponse, JsonResponse
+from django.views.generic.edit import CreateView, FormView
 from django.urls import reverse_lazy
 
-from .forms import CustomUserCreationForm
+from .forms import CustomUserCreationForm, UserTimezoneForm
+from .models import User
 
 
 class SignupView(CreateView):
     form_class = CustomUserCreationForm
     success_url = reverse_lazy('login')
-    template_name = 'registration/signup.html'
\ No newline at end of file
+    template_name = 'registration/signup.html'
+
+
+class UserTimezoneView(FormView):
+    """Takes the timezone reported by the browser."""
+    form_class = UserTimezoneForm
+    http_method_names = ['post']
+
+    def form_valid(self, form):
+        tzname = form.cleaned_data['timezone']
+        user = self.request.user
+        if user.is_authenticated and user.timezone != tzname:
+            User.objects.filter(pk=user.pk).update(timezone=tzname)
+        self.request.session['user_timezone'] = tzname
+        return HttpResponse(status=204)
+
+    def form_invalid(self, form):
+        return JsonResponse({'errors': form.errors}, status=400)
@@ -0,0 +1,98 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+class MemoryCache:
+    """Thread-safe LRU of bytes values limited by their total size."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_size:
+            return
+        with self._lock:
+            old_value = self._data.pop(key, None)
+            if old_value is not None:
+                self.size -= len(old_value)
+            self._data[key] = value
+            self.size += len(value)
+            while self.size > self.max_size:
+                _, evicted = self._data.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+
+class AvatarCache:
+    """Rendered avatars in process memory backed by a shared Django cache.
+
+    Keys are content hashes, so entries never have to be invalidated.
+    """
+    key_prefix = 'avatars:'
+
+    def __init__(self, memory_size, alias, timeout):
+        self.memory = MemoryCache(memory_size)
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    @property
+    def is_local(self):
+        """Whether the shared cache is only seen by this process."""
+        return isinstance(self.shared, (LocMemCache, DummyCache))
+
+    def get(self, key):
+        data = self.memory.get(key)
+        if data is None:
+            data = self.shared.get(self.key_prefix + key)
+            if data is not None:
+                self.memory.set(key, data)
+        return data
+
+    def set(self, key, data):
+        self.memory.set(key, data)
+        self.shared.set(self.key_prefix + key, data, self.timeout)
+
+    def missing(self, keys):
+        """Return the keys that are not in the shared cache."""
+        found = self.shared.get_many([self.key_prefix + key for key in keys])
+        return [key for key in keys if self.key_prefix + key not in found]
+
+    def set_many(self, data):
+        """Store a dict of rendered avatars in the shared cache only."""
+        self.shared.set_many(
+            {self.key_prefix + key: value for key, value in data.items()},
+            self.timeout
+        )
+
+    def clear(self):
+        self.memory.clear()
+
+
+avatar_cache = AvatarCache(
+    settings.AVATARS_MEMORY_CACHE_SIZE,
+    settings.AVATARS_CACHE,
+    settings.AVATARS_CACHE_TIMEOUT
+)
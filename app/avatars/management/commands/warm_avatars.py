@@ -0,0 +1,70 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from avatars.cache import avatar_cache
+from avatars.pool import RenderPool
+from avatars.render import SIZES
+from avatars.warm import get_checkpoint, warm_avatars
+
+
+class Command(BaseCommand):
+    help = 'Render the avatars of all users into the avatar cache'
+
+    def add_arguments(self, parser):
+        start = parser.add_mutually_exclusive_group()
+        start.add_argument(
+            '--start-after', type=int, default=0, metavar='ID',
+            help='Only warm users with ids greater than ID'
+        )
+        start.add_argument(
+            '--resume', action='store_true',
+            help='Continue after the last user warmed by an interrupted run'
+        )
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Rendering processes, 0 renders in this one'
+        )
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=SIZES, choices=SIZES
+        )
+
+    def handle(self, *args, **options):
+        if avatar_cache.is_local:
+            # Avatars and the checkpoint would be gone with this process
+            raise CommandError(
+                f"The {settings.AVATARS_CACHE!r} cache is local to this "
+                "process, set CACHE_URL or AVATARS_CACHE to a cache shared "
+                "with the web workers"
+            )
+
+        start_after = options['start_after']
+        if options['resume']:
+            start_after = get_checkpoint()
+            self.stdout.write(f"Resuming after user {start_after}")
+
+        pool = RenderPool(workers=options['workers'], max_pending=0)
+        users = rendered = 0
+        started = time.monotonic()
+        try:
+            for last_pk, chunk_users, chunk_rendered in warm_avatars(
+                pool, start_after, options['chunk_size'], options['sizes']
+            ):
+                users += chunk_users
+                rendered += chunk_rendered
+                elapsed = max(time.monotonic() - started, 1e-6)
+                self.stdout.write(
+                    f"Warmed {users} users up to id {last_pk}, rendered "
+                    f"{rendered} avatars ({rendered / elapsed:.1f}/s)"
+                )
+        finally:
+            pool.shutdown()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"Rendered {rendered} avatars of {users} users "
+            f"in {elapsed:.1f}s"
+        )
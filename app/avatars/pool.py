@@ -0,0 +1,85 @@
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+
+class RenderPool:
+    """Runs renders in worker processes, off the request thread.
+
+    Concurrent submissions with the same key share one render. Once
+    max_pending renders are queued or running, submit() refuses new ones,
+    so a burst can't pile up unbounded work. With no workers renders run
+    in the calling thread.
+    """
+
+    def __init__(self, workers, max_pending):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args, on_done=None):
+        """Return a future of fn(*args), or None if the pool is saturated.
+
+        on_done is called with the future once the render completes,
+        only by the submission that started it.
+        """
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                return future
+            if len(self._pending) >= self.max_pending:
+                return None
+            inline = not self.workers
+            future = Future() if inline else self._submit(fn, *args)
+            self._pending[key] = future
+        future.add_done_callback(lambda future: self._forget(key, future))
+        if on_done is not None:
+            future.add_done_callback(on_done)
+        if inline:
+            # Outside of the lock, so inline renders run concurrently
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+        return future
+
+    def map(self, fn, *iterables, chunksize=1):
+        if not self.workers:
+            return map(fn, *iterables)
+        with self._lock:
+            executor = self._get_executor()
+        return executor.map(fn, *iterables, chunksize=chunksize)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def _submit(self, fn, *args):
+        try:
+            return self._get_executor().submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died, start over with a new pool
+            self._executor = None
+            return self._get_executor().submit(fn, *args)
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+
+render_pool = RenderPool(
+    settings.AVATARS_RENDER_WORKERS,
+    settings.AVATARS_RENDER_MAX_PENDING
+)
@@ -0,0 +1,99 @@
+import base64
+import hashlib
+import random
+import re
+
+import py_avataaars
+from cairosvg import svg2png
+
+
+# Enums the attributes of an avatar are drawn from, in the order of the
+# draws: changing it changes every existing avatar
+ATTRIBUTES = tuple(
+    (name, tuple(enum_)) for name, enum_ in (
+        ('skin_color', py_avataaars.SkinColor),
+        ('hair_color', py_avataaars.HairColor),
+        ('facial_hair_type', py_avataaars.FacialHairType),
+        ('facial_hair_color', py_avataaars.HairColor),
+        ('top_type', py_avataaars.TopType),
+        ('hat_color', py_avataaars.Color),
+        ('mouth_type', py_avataaars.MouthType),
+        ('eye_type', py_avataaars.EyesType),
+        ('eyebrow_type', py_avataaars.EyebrowType),
+        ('nose_type', py_avataaars.NoseType),
+        ('accessories_type', py_avataaars.AccessoriesType),
+        ('clothe_type', py_avataaars.ClotheType),
+        ('clothe_color', py_avataaars.Color),
+        ('clothe_graphic_type', py_avataaars.ClotheGraphicType),
+    )
+)
+
+# Part of every avatar key: bump it when a change to the rendering changes
+# the images, so cached ones and versioned URLs are replaced
+STYLE_VERSION = 1
+
+# Widths in pixels PNG avatars are rendered at, besides the full size
+SIZES = (40, 80, 160)
+
+# Transparent 1x1 image served while the pool is saturated
+PLACEHOLDER_PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR4nGNgYGBgAAAABQAB'
+    'pfZFQAAAAABJRU5ErkJggg=='
+)
+
+_SVG_ID = re.compile(r'(?<=id=")x\d+|(?<=#)x\d+\b')
+
+
+def avatar_key(seed, **options):
+    """Return a hash identifying the image of seed rendered with options.
+
+    Options set to None are left out, they mean the default rendering.
+    """
+    parts = [seed, f'style={STYLE_VERSION}'] + [
+        f'{name}={value}' for name, value in sorted(options.items())
+        if value is not None
+    ]
+    return hashlib.sha256('\0'.join(parts).encode()).hexdigest()
+
+
+def avatar_version(key):
+    """Return the short form of key used to version avatar URLs."""
+    return key[:16]
+
+
+def choose_attributes(seed=None):
+    """Draw the attributes of the avatar of seed, random ones if it's None.
+
+    A private generator is used, so concurrent renders don't affect each
+    other's draws.
+    """
+    rng = random.Random(seed)
+    return {name: rng.choice(values) for name, values in ATTRIBUTES}
+
+
+def _canonicalize_ids(svg):
+    # py_avataaars numbers element ids in the order of random uuids, so
+    # renumber them in the order they appear in the document
+    ids = {}
+    return _SVG_ID.sub(
+        lambda match: ids.setdefault(match.group(), f'a{len(ids)}'), svg
+    )
+
+
+def render_avatar_svg(seed=None):
+    avatar = py_avataaars.PyAvataaar(
+        style=py_avataaars.AvatarStyle.CIRCLE, **choose_attributes(seed)
+    )
+    return _canonicalize_ids(avatar.render_svg())
+
+
+def render_avatar(seed=None, size=None):
+    """Render the avatar of seed as PNG, a random one if seed is None.
+
+    The image is size pixels wide and high, the full size if it's None.
+    The same seed always gives the same bytes.
+    """
+    options = {}
+    if size is not None:
+        options = {'output_width': size, 'output_height': size}
+    return svg2png(bytestring=render_avatar_svg(seed).encode(), **options)
@@ -0,0 +1,47 @@
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from .cache import avatar_cache
+from .pool import RenderPool
+from .warm import get_user_chunk, warm_users
+
+
+logger = get_task_logger(__name__)
+
+
+@shared_task
+def warm_avatar_cache(chunk_size=500):
+    """Queue a warm_avatar_chunk task for every chunk of users.
+
+    Chunks are rendered in parallel by the Celery workers. Returns the
+    number of queued chunks.
+    """
+    if avatar_cache.is_local:
+        logger.warning(
+            "The %r avatar cache is local to each worker process, warmed "
+            "avatars won't reach the web workers", settings.AVATARS_CACHE
+        )
+    pks = get_user_model().objects.order_by('pk').values_list('pk', flat=True)
+    start_after = 0
+    chunks = 0
+    while True:
+        chunk = list(pks.filter(pk__gt=start_after)[:chunk_size])
+        if not chunk:
+            break
+        warm_avatar_chunk.delay(start_after, chunk_size)
+        start_after = chunk[-1]
+        chunks += 1
+    return chunks
+
+
+@shared_task
+def warm_avatar_chunk(start_after, chunk_size=500):
+    """Render the missing avatars of the chunk_size users after start_after.
+
+    Worker processes of Celery can't start a process pool of their own,
+    so the renders run in the worker. Returns the number of renders.
+    """
+    users = get_user_chunk(start_after, chunk_size)
+    return warm_users(RenderPool(workers=0, max_pending=0), users)
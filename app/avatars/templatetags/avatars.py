@@ -0,0 +1,21 @@
+from django import template
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from ..render import avatar_key, avatar_version
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def avatar_url(seed, size=None):
+    """Return the versioned URL of the PNG avatar of seed.
+
+    The URL changes together with the image, so browsers may keep the
+    response forever. Bump STYLE_VERSION to change every URL at once.
+    """
+    query = {'v': avatar_version(avatar_key(seed, size=size))}
+    if size is not None:
+        query = {'size': size, **query}
+    return f"{reverse('avatars:get', args=(seed,))}?{urlencode(query)}"
@@ -1,3 +1,327 @@
-from django.test import TestCase
+import io
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from .cache import AvatarCache, MemoryCache, avatar_cache
+from .pool import RenderPool
+from .tasks import warm_avatar_chunk
+from .templatetags.avatars import avatar_url
+from .warm import get_checkpoint, warm_avatars
+from .render import (
+    PLACEHOLDER_PNG,
+    SIZES,
+    avatar_key,
+    choose_attributes,
+    render_avatar,
+    render_avatar_svg
+)
+
+
+class MemoryCacheTest(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        memory = MemoryCache(max_size=10)
+        memory.set('a', b'aaaa')
+        memory.set('b', b'bbbb')
+        memory.get('a')
+        memory.set('c', b'cccc')
+        self.assertEqual(memory.get('a'), b'aaaa')
+        self.assertIsNone(memory.get('b'))
+        self.assertEqual(memory.get('c'), b'cccc')
+        self.assertEqual(memory.size, 8)
+
+    def test_skips_values_over_budget(self):
+        memory = MemoryCache(max_size=3)
+        memory.set('a', b'aaaa')
+        self.assertIsNone(memory.get('a'))
+        self.assertEqual(memory.size, 0)
+
+    def test_replaces_value(self):
+        memory = MemoryCache(max_size=10)
+        memory.set('a', b'aaaa')
+        memory.set('a', b'aa')
+        self.assertEqual(memory.get('a'), b'aa')
+        self.assertEqual(memory.size, 2)
+
+
+class RenderAvatarTest(SimpleTestCase):
+    def test_same_seed_same_bytes(self):
+        self.assertEqual(
+            render_avatar_svg('testuser'), render_avatar_svg('testuser')
+        )
+        self.assertEqual(render_avatar('testuser'), render_avatar('testuser'))
+
+    def test_seeds_differ(self):
+        svgs = {render_avatar_svg(f'user{i}') for i in range(5)}
+        self.assertEqual(len(svgs), 5)
+
+    def test_global_random_is_not_used(self):
+        expected = choose_attributes('testuser')
+        random.seed('testuser')
+        state = random.getstate()
+        self.assertEqual(choose_attributes('testuser'), expected)
+        self.assertEqual(random.getstate(), state)
+
+    def test_sizes(self):
+        self.assertEqual(
+            avatar_key('testuser', size=None), avatar_key('testuser')
+        )
+        self.assertEqual(
+            len({render_avatar('testuser', size) for size in SIZES}),
+            len(SIZES)
+        )
+
+    def test_concurrent_draws(self):
+        seeds = [f'user{i % 10}' for i in range(200)]
+        expected = [choose_attributes(seed) for seed in seeds]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            self.assertEqual(
+                list(executor.map(choose_attributes, seeds)), expected
+            )
+
+
+class RenderPoolTest(SimpleTestCase):
+    def setUp(self):
+        self.pool = RenderPool(workers=1, max_pending=1)
+        self.addCleanup(self.pool.shutdown)
+
+    def test_same_key_shares_render(self):
+        first = self.pool.submit('a', time.sleep, 0.2)
+        second = self.pool.submit('a', time.sleep, 0.2)
+        self.assertIs(first, second)
+        self.assertIsNone(first.result())
+
+    def test_saturated_pool_refuses_renders(self):
+        first = self.pool.submit('a', time.sleep, 0.2)
+        self.assertIsNone(self.pool.submit('b', abs, -1))
+        first.result()
+        for _ in range(50):
+            future = self.pool.submit('b', abs, -1)
+            if future is not None:
+                break
+            time.sleep(0.01)
+        self.assertEqual(future.result(), 1)
+
+    def test_inline_renders(self):
+        pool = RenderPool(workers=0, max_pending=1)
+        self.assertEqual(pool.submit('a', abs, -1).result(), 1)
+        with self.assertRaises(TypeError):
+            pool.submit('b', abs, 'x').result()
+
+    def test_inline_renders_run_concurrently(self):
+        pool = RenderPool(workers=0, max_pending=2)
+        barrier = threading.Barrier(2)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [
+                executor.submit(pool.submit, key, barrier.wait, 1)
+                for key in ('a', 'b')
+            ]
+            # Waits forever on the barrier if the renders run one by one
+            self.assertEqual(
+                sorted(future.result().result() for future in futures),
+                [0, 1]
+            )
+
+
+class AvatarImageViewTest(SimpleTestCase):
+    def setUp(self):
+        pool = mock.patch(
+            'avatars.views.render_pool', RenderPool(workers=0, max_pending=8)
+        )
+        pool.start()
+        self.addCleanup(pool.stop)
+        cache.clear()
+        avatar_cache.clear()
+        self.addCleanup(cache.clear)
+        self.addCleanup(avatar_cache.clear)
+        self.url = reverse('avatars:get', args=('testuser',))
+
+    def test_renders_once(self):
+        with mock.patch(
+            'avatars.views.render_avatar', return_value=b'png'
+        ) as render:
+            for _ in range(3):
+                response = self.client.get(self.url)
+                self.assertEqual(response.content, b'png')
+            avatar_cache.clear()
+            self.client.get(self.url)
+        render.assert_called_once_with('testuser', None)
+
+    def test_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], f'"{avatar_key("testuser")}"')
+
+        with mock.patch('avatars.views.render_avatar') as render:
+            response = self.client.get(
+                self.url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(response.status_code, 304)
+        render.assert_not_called()
+
+    def test_random_avatar_is_not_cached(self):
+        response = self.client.get(reverse('avatars:get', args=('random',)))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_placeholder_when_saturated(self):
+        with mock.patch('avatars.views.render_pool') as pool:
+            pool.submit.return_value = None
+            response = self.client.get(self.url)
+        self.assertEqual(response.content, PLACEHOLDER_PNG)
+        self.assertEqual(response['ETag'], '"placeholder"')
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        response = self.client.get(self.url)
+        self.assertNotEqual(response.content, PLACEHOLDER_PNG)
+
+    @override_settings(AVATARS_RENDER_TIMEOUT=0.01)
+    def test_late_render_is_cached(self):
+        future = Future()
+        with mock.patch('avatars.views.render_pool') as pool:
+            pool.submit.return_value = future
+            response = self.client.get(self.url)
+            self.assertEqual(response.content, PLACEHOLDER_PNG)
+
+            future.add_done_callback(pool.submit.call_args.kwargs['on_done'])
+            future.set_result(b'png')
+            response = self.client.get(self.url)
+        self.assertEqual(response.content, b'png')
+        pool.submit.assert_called_once()
+
+    def test_placeholder_when_render_fails(self):
+        with mock.patch(
+            'avatars.views.render_avatar', side_effect=RuntimeError
+        ):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, PLACEHOLDER_PNG)
+        self.assertIsNone(avatar_cache.get(avatar_key('testuser')))
+
+    def test_sizes_are_cached_separately(self):
+        with mock.patch(
+            'avatars.views.render_avatar',
+            side_effect=lambda seed, size: b'%d' % size
+        ) as render:
+            for size in SIZES * 2:
+                response = self.client.get(self.url, {'size': size})
+                self.assertEqual(response.content, b'%d' % size)
+                self.assertEqual(
+                    response['ETag'], f'"{avatar_key("testuser", size=size)}"'
+                )
+        self.assertEqual(render.call_count, len(SIZES))
+
+    def test_invalid_size(self):
+        for size in ('41', 'big', ''):
+            response = self.client.get(self.url, {'size': size})
+            self.assertEqual(response.status_code, 400)
+            self.assertNotIn('ETag', response)
+
+    def test_svg(self):
+        url = reverse('avatars:get_svg', args=('testuser',))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertEqual(
+            response.content, render_avatar_svg('testuser').encode()
+        )
+        self.assertEqual(
+            response['ETag'], f'"{avatar_key("testuser", format="svg")}"'
+        )
+
+        with mock.patch('avatars.views.render_avatar') as render:
+            self.client.get(url)
+        render.assert_not_called()
+
+    def test_versioned_url_is_immutable(self):
+        response = self.client.get(avatar_url('testuser', 40))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+
+        response = self.client.get(self.url, {'size': 40, 'v': 'stale'})
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=60', response['Cache-Control'])
+
+    def test_versioned_url_changes_with_style(self):
+        url = avatar_url('testuser', 40)
+        self.assertNotEqual(url, avatar_url('testuser', 80))
+        with mock.patch('avatars.render.STYLE_VERSION', 2):
+            self.assertNotEqual(url, avatar_url('testuser', 40))
+
+
+class WarmAvatarsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.users = [
+            get_user_model().objects.create(username=f'user{i}')
+            for i in range(5)
+        ]
+        self.pool = RenderPool(workers=0, max_pending=0)
+
+    def shared_cache(self):
+        # The cache of the tests is local to their process
+        return mock.patch.object(
+            AvatarCache, 'is_local', new_callable=mock.PropertyMock,
+            return_value=False
+        )
+
+    def assertWarmed(self, users, sizes=SIZES):
+        for user in users:
+            for size in sizes:
+                self.assertIsNotNone(
+                    avatar_cache.get(avatar_key(user.username, size=size))
+                )
+
+    def test_warms_missing_avatars(self):
+        progress = list(warm_avatars(self.pool, chunk_size=2))
+        self.assertEqual(
+            [(users, rendered) for _, users, rendered in progress],
+            [(2, 2 * len(SIZES)), (2, 2 * len(SIZES)), (1, len(SIZES))]
+        )
+        self.assertWarmed(self.users)
+        self.assertEqual(get_checkpoint(), 0)
+
+        progress = list(warm_avatars(self.pool, chunk_size=2))
+        self.assertEqual(sum(rendered for *_, rendered in progress), 0)
+
+    def test_resumes_from_checkpoint(self):
+        warming = warm_avatars(self.pool, chunk_size=2)
+        next(warming)
+        self.assertEqual(get_checkpoint(), self.users[1].pk)
+
+        with self.shared_cache():
+            call_command(
+                'warm_avatars', '--resume', '--workers', '0', '--sizes', '40',
+                stdout=io.StringIO()
+            )
+        self.assertWarmed(self.users[2:], sizes=(40,))
+        self.assertIsNone(
+            avatar_cache.shared.get(
+                avatar_cache.key_prefix
+                + avatar_key(self.users[2].username, size=80)
+            )
+        )
+        self.assertEqual(get_checkpoint(), 0)
+
+    def test_command_requires_shared_cache(self):
+        with self.assertRaisesMessage(CommandError, 'local to this process'):
+            call_command('warm_avatars', '--workers', '0', stdout=io.StringIO())
+        self.assertIsNone(
+            avatar_cache.get(avatar_key(self.users[0].username, size=40))
+        )
+
+    def test_warm_chunk_task(self):
+        rendered = warm_avatar_chunk(self.users[0].pk, chunk_size=2)
+        self.assertEqual(rendered, 2 * len(SIZES))
+        self.assertWarmed(self.users[1:3])
@@ -1,8 +1,9 @@
 from django.urls import path
 
-from .views import avatar_image
+from .views import avatar_image, avatar_svg
 
 app_name = 'avatars'
 urlpatterns = [
     path('avatar.<str:seed>.png/', avatar_image, name='get'),
+    path('avatar.<str:seed>.svg/', avatar_svg, name='get_svg'),
 ]
@@ -1,47 +1,141 @@
-import io
-import random
+import uuid
 
-import py_avataaars
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBadRequest
 from django.utils.cache import add_never_cache_headers, patch_cache_control
+from django.views.decorators.http import etag
 
+from .cache import avatar_cache
+from .pool import render_pool
+from .render import (
+    PLACEHOLDER_PNG,
+    SIZES,
+    avatar_key,
+    avatar_version,
+    render_avatar,
+    render_avatar_svg
+)
+
+# Versioned URLs change with the image, so their responses never go stale
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def _get_seed(request, seed):
+    return seed or request.GET.get("seed") or "random"
+
+
+def _get_size(request):
+    """Return the requested size, None for the full one.
+
+    Raises ValueError for sizes that are not allowed.
+    """
+    size = request.GET.get("size")
+    if size is None:
+        return None
+    size = int(size)
+    if size not in SIZES:
+        raise ValueError(f"Size {size} is not allowed")
+    return size
 
-def avatar_image(request, seed=None):
-    if not seed:
-        seed = request.GET.get("seed") or "random"
-
-    if seed != "random":
-        random.seed(seed)
-
-    bytes = io.BytesIO()
-
-    def r(enum_):
-        return random.choice(list(enum_))
-
-    avatar = py_avataaars.PyAvataaar(
-        style=py_avataaars.AvatarStyle.CIRCLE,
-        skin_color=r(py_avataaars.SkinColor),
-        hair_color=r(py_avataaars.HairColor),
-        facial_hair_type=r(py_avataaars.FacialHairType),
-        facial_hair_color=r(py_avataaars.HairColor),
-        top_type=r(py_avataaars.TopType),
-        hat_color=r(py_avataaars.Color),
-        mouth_type=r(py_avataaars.MouthType),
-        eye_type=r(py_avataaars.EyesType),
-        eyebrow_type=r(py_avataaars.EyebrowType),
-        nose_type=r(py_avataaars.NoseType),
-        accessories_type=r(py_avataaars.AccessoriesType),
-        clothe_type=r(py_avataaars.ClotheType),
-        clothe_color=r(py_avataaars.Color),
-        clothe_graphic_type=r(py_avataaars.ClotheGraphicType),
-    )
-    avatar.render_png_file(bytes)
 
-    response = HttpResponse(bytes.getvalue())
-    response["content-type"] = "image/png"
+def _store(key):
+    def on_done(future):
+        if not future.cancelled() and future.exception() is None:
+            avatar_cache.set(key, future.result())
+    return on_done
+
+
+def _render(key, render, *args, store=True):
+    """Render in the pool, None if it is saturated, late or failed.
+
+    With store, the image is cached once rendered, a late one included,
+    so that it's ready for the next request.
+    """
+    on_done = _store(key) if store else None
+    future = render_pool.submit(key, render, *args, on_done=on_done)
+    if future is None:
+        return None
+    try:
+        return future.result(timeout=settings.AVATARS_RENDER_TIMEOUT)
+    except Exception:
+        # Timeouts, a broken pool or an error of the render itself
+        return None
+
+
+def _avatar_response(request, seed, key, content_type, render, *args):
     if seed == "random":
+        data = _render(uuid.uuid4().hex, render, None, *args, store=False)
+        if data is None:
+            return _placeholder_response()
+        response = HttpResponse(data, content_type=content_type)
         add_never_cache_headers(response)
+        return response
+
+    data = avatar_cache.get(key)
+    if data is None:
+        data = _render(key, render, seed, *args)
+        if data is None:
+            return _placeholder_response()
+
+    response = HttpResponse(data, content_type=content_type)
+    if request.GET.get("v") == avatar_version(key):
+        patch_cache_control(
+            response, max_age=IMMUTABLE_MAX_AGE, public=True, immutable=True
+        )
     else:
         patch_cache_control(response, max_age=60, public=True)
+    return response
 
+
+def _placeholder_response():
+    response = HttpResponse(PLACEHOLDER_PNG, content_type="image/png")
+    # Keep browsers from revalidating the placeholder as the avatar
+    response["ETag"] = '"placeholder"'
+    add_never_cache_headers(response)
     return response
+
+
+def avatar_etag(request, seed=None):
+    seed = _get_seed(request, seed)
+    if seed == "random":
+        return None
+    try:
+        return avatar_key(seed, size=_get_size(request))
+    except ValueError:
+        return None
+
+
+@etag(avatar_etag)
+def avatar_image(request, seed=None):
+    seed = _get_seed(request, seed)
+    try:
+        size = _get_size(request)
+    except ValueError:
+        return HttpResponseBadRequest(
+            f"Size must be one of {', '.join(map(str, SIZES))}"
+        )
+    return _avatar_response(
+        request, seed, avatar_key(seed, size=size), "image/png",
+        render_avatar, size
+    )
+
+
+def _render_svg_bytes(seed):
+    return render_avatar_svg(seed).encode()
+
+
+def avatar_svg_etag(request, seed=None):
+    seed = _get_seed(request, seed)
+    if seed == "random":
+        return None
+    return avatar_key(seed, format="svg")
+
+
+@etag(avatar_svg_etag)
+def avatar_svg(request, seed=None):
+    """The avatar before rasterization, for clients scaling it themselves."""
+    seed = _get_seed(request, seed)
+    return _avatar_response(
+        request, seed, avatar_key(seed, format="svg"), "image/svg+xml",
+        _render_svg_bytes
+    )
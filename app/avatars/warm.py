@@ -0,0 +1,63 @@
+"""Bulk rendering of user avatars into the shared avatar cache.
+
+Users are warmed in chunks in primary key order. Avatars already in the
+cache are skipped, so warming again after an interruption only costs
+cache lookups for the users done before it.
+"""
+from django.contrib.auth import get_user_model
+
+from .cache import avatar_cache
+from .render import SIZES, avatar_key, render_avatar
+
+
+CHECKPOINT_KEY = 'avatars:warm:checkpoint'
+
+
+def get_checkpoint():
+    """Return the id of the last user warmed by an unfinished run."""
+    return avatar_cache.shared.get(CHECKPOINT_KEY, 0)
+
+
+def get_user_chunk(start_after, chunk_size):
+    """Return ids and usernames of the chunk_size users after start_after."""
+    return list(
+        get_user_model().objects.filter(pk__gt=start_after).order_by('pk')
+        .values_list('pk', 'username')[:chunk_size]
+    )
+
+
+def warm_users(pool, users, sizes=SIZES):
+    """Render the missing avatars of (id, username) pairs across the pool.
+
+    Returns the number of rendered avatars.
+    """
+    variants = {
+        avatar_key(username, size=size): (username, size)
+        for _, username in users for size in sizes
+    }
+    missing = avatar_cache.missing(list(variants))
+    if missing:
+        # Seeds and sizes as the two argument lists of render_avatar
+        args = zip(*(variants[key] for key in missing))
+        images = pool.map(render_avatar, *args, chunksize=16)
+        avatar_cache.set_many(dict(zip(missing, images)))
+    return len(missing)
+
+
+def warm_avatars(pool, start_after=0, chunk_size=500, sizes=SIZES):
+    """Warm the avatars of all users with ids after start_after.
+
+    Yields the last user id, the number of users and the number of
+    rendered avatars of each chunk. The last id is saved as the
+    checkpoint until the run completes.
+    """
+    while True:
+        users = get_user_chunk(start_after, chunk_size)
+        if not users:
+            break
+        rendered = warm_users(pool, users, sizes)
+        start_after = users[-1][0]
+        avatar_cache.shared.set(CHECKPOINT_KEY, start_after, None)
+        yield start_after, len(users), rendered
+
+    avatar_cache.shared.delete(CHECKPOINT_KEY)
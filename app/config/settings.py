@@ -57,9 +57,9 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'tasks.middleware.UserTimezoneMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'tasks.middleware.UserTimezoneMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -151,14 +151,81 @@ LOGOUT_REDIRECT_URL = 'tasks:index'
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
+# Cache settings
+# The cache has to be shared by web and celery workers, e.g. redis://redis:6379/1
+
+CACHE_URL = env.str('CACHE_URL', None)
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+
 # Celery settings
 CELERY_BROKER_URL = env.str('CELERY_BROKER_URL')
 CELERY_RESULT_BACKEND = env.str('CELERY_RESULT_BACKEND')
 CELERY_TIMEZONE = 'UTC'
+CELERY_BEAT_SCHEDULE = {
+    'fail-expired-tasks': {
+        'task': 'tasks.tasks.fail_expired_tasks',
+        'schedule': 60.0,
+    },
+}
 
 # Notifications settings
 
 NOTIFICATIONS_TELEGRAM_BOT_TOKEN = env.str('NOTIFICATIONS_TELEGRAM_BOT_TOKEN')
 NOTIFICATIONS_TEST_TELEGRAM_USER_ID = env.str('NOTIFICATIONS_TEST_TELEGRAM_USER_ID')
 
-IPGEOLOCATION_API_KEY = env.str('IPGEOLOCATION_API_KEY')
\ No newline at end of file
+IPGEOLOCATION_API_KEY = env.str('IPGEOLOCATION_API_KEY')
+
+# Timezone detection settings
+
+# Table built by `manage.py build_iptz_table`
+IPTZ_TABLE_PATH = env.str('IPTZ_TABLE_PATH', None)
+# Ask ipgeolocation.io about addresses missing from the table
+IPTZ_HTTP_FALLBACK = env.bool('IPTZ_HTTP_FALLBACK', True)
+IPTZ_HTTP_TIMEOUT = env.float('IPTZ_HTTP_TIMEOUT', 2.0)
+# Lifetimes of resolved and failed lookups in the cache, a table that
+# failed to load is also tried again after the latter
+IPTZ_CACHE_TIMEOUT = env.int('IPTZ_CACHE_TIMEOUT', 60 * 60 * 24 * 7)
+IPTZ_FAILURE_CACHE_TIMEOUT = env.int('IPTZ_FAILURE_CACHE_TIMEOUT', 60 * 60)
+# A lookup lost by the workers is scheduled again after this time
+IPTZ_PENDING_TIMEOUT = env.int('IPTZ_PENDING_TIMEOUT', 60)
+
+# Avatars settings
+
+# Alias of the cache shared by the processes rendering avatars. Warming
+# the cache with warm_avatars needs one shared with the web workers, which
+# 'default' is only when CACHE_URL is set.
+AVATARS_CACHE = env.str('AVATARS_CACHE', 'default')
+AVATARS_CACHE_TIMEOUT = env.int('AVATARS_CACHE_TIMEOUT', 60 * 60 * 24 * 30)
+# Bytes of rendered avatars kept in the memory of each process
+AVATARS_MEMORY_CACHE_SIZE = env.int(
+    'AVATARS_MEMORY_CACHE_SIZE', 32 * 1024 * 1024
+)
+# Processes rendering avatars in each web worker, 0 renders in the request
+AVATARS_RENDER_WORKERS = env.int('AVATARS_RENDER_WORKERS', 2)
+# Renders queued or running at once, more get a placeholder image
+AVATARS_RENDER_MAX_PENDING = env.int('AVATARS_RENDER_MAX_PENDING', 32)
+# Seconds a request waits for its render before getting a placeholder
+AVATARS_RENDER_TIMEOUT = env.float('AVATARS_RENDER_TIMEOUT', 5.0)
+
+# Friendships settings
+
+# 'pairs' stores a friendship as two Friend rows, one per direction,
+# 'canonical' as one Friendship row. Only the storage in use is written:
+# after switching, run `manage.py copy_friendships` to replace its rows
+# with the friendships of the other one.
+FRIENDSHIPS_STORAGE = env.str('FRIENDSHIPS_STORAGE', 'pairs')
+
+# Cache friend id sets and suggestions. Changes are seen by other processes
+# through the cache only, so this needs a cache shared by the web and
+# celery workers and is off unless CACHE_URL is set.
+FRIENDSHIPS_CACHE = env.bool('FRIENDSHIPS_CACHE', bool(CACHE_URL))
+# Lifetime of cached friend id sets, they are invalidated on changes
+FRIENDSHIPS_CACHE_TIMEOUT = env.int('FRIENDSHIPS_CACHE_TIMEOUT', 60 * 60 * 24)
+# Friend id sets kept in the memory of each process
+FRIENDSHIPS_MEMORY_CACHE_SIZE = env.int('FRIENDSHIPS_MEMORY_CACHE_SIZE', 4096)
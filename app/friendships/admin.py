@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Friend, FriendshipRequest
+from .models import Friend, Friendship, FriendshipRequest
 
 
 class FriendshipRequestAdmin(admin.ModelAdmin):
@@ -15,5 +15,12 @@ class FriendAdmin(admin.ModelAdmin):
     readonly_fields = ['create_date']
 
 
+class FriendshipAdmin(admin.ModelAdmin):
+    model = Friendship
+    raw_id_fields = ['user_low', 'user_high']
+    readonly_fields = ['create_date']
+
+
 admin.site.register(Friend, FriendAdmin)
+admin.site.register(Friendship, FriendshipAdmin)
 admin.site.register(FriendshipRequest, FriendshipRequestAdmin)
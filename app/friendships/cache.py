@@ -0,0 +1,100 @@
+"""Cached sets of friend ids.
+
+The friend ids of a user are stored in the cache under a key holding the
+current version of the user's friendships. Changes bump the version
+instead of deleting the entry, so a set read from the database before
+the change and stored after it lands under the old key and is never
+served. Each process also keeps recent sets in memory by the same
+versioned keys, leaving one cache lookup per check.
+
+The versions only reach every process through a cache they all share, so
+nothing is cached unless the FRIENDSHIPS_CACHE setting is on.
+"""
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _version_key(user_id):
+    return f'friendships:version:{user_id}'
+
+
+def _friend_ids_key(user_id, version, storage):
+    # Sets read from one storage are never served after switching to the
+    # other one
+    return f'friendships:friend_ids:{storage}:{user_id}:{version}'
+
+
+def _new_version():
+    # Never reuses a version whose entries may still be cached
+    return time.time_ns()
+
+
+def get_versions(user_ids):
+    """Return a dict of the current friendships version of each user."""
+    keys = {_version_key(user_id): user_id for user_id in user_ids}
+    versions = {
+        keys[key]: version for key, version in cache.get_many(keys).items()
+    }
+    for key, user_id in keys.items():
+        if user_id not in versions:
+            cache.add(key, _new_version(), None)
+            # A fresh version each time if the cache doesn't keep values
+            versions[user_id] = cache.get(key) or _new_version()
+    return versions
+
+
+@lru_cache(maxsize=settings.FRIENDSHIPS_MEMORY_CACHE_SIZE)
+def _get_friend_ids(user_id, version, storage):
+    key = _friend_ids_key(user_id, version, storage)
+    friend_ids = cache.get(key)
+    if friend_ids is None:
+        friend_ids = _query_friend_ids(user_id, storage)
+        cache.set(key, friend_ids, settings.FRIENDSHIPS_CACHE_TIMEOUT)
+    return friend_ids
+
+
+def _query_friend_ids(user_id, storage):
+    from .models import Friend, Friendship
+
+    if storage == 'canonical':
+        friends = Friendship.objects.of(user_id)
+        field = 'friend_id'
+    else:
+        friends = Friend.objects.filter(to_user_id=user_id)
+        field = 'from_user_id'
+    return frozenset(friends.values_list(field, flat=True))
+
+
+def get_friend_ids(user_id):
+    """Return the frozenset of ids of the friends of a user."""
+    if not settings.FRIENDSHIPS_CACHE:
+        return _query_friend_ids(user_id, settings.FRIENDSHIPS_STORAGE)
+    return _get_friend_ids(
+        user_id, get_versions([user_id])[user_id],
+        settings.FRIENDSHIPS_STORAGE
+    )
+
+
+def _bump_versions(user_ids):
+    for user_id in user_ids:
+        try:
+            cache.incr(_version_key(user_id))
+        except ValueError:
+            cache.set(_version_key(user_id), _new_version(), None)
+
+
+def invalidate_friend_ids(*user_ids):
+    """Drop the cached friend ids of users whose friendships changed.
+
+    Call it within the transaction making the change: the versions are
+    bumped right away and again on commit, since a set read in between
+    would still hold the old friendships.
+    """
+    if not settings.FRIENDSHIPS_CACHE:
+        return
+    _bump_versions(user_ids)
+    transaction.on_commit(lambda: _bump_versions(user_ids))
@@ -1,5 +1,8 @@
 from django.contrib.auth import get_user_model
-from django.forms import CharField, Form, ModelChoiceField, Textarea
+from django.forms import (
+    CharField, CheckboxSelectMultiple, Form, ModelChoiceField,
+    ModelMultipleChoiceField, Textarea
+)
 
 from . import manager as friendship_manager
 from .models import FriendshipRequest
@@ -78,4 +81,32 @@ class FriendModelChoiceField(ModelChoiceField):
     def user(self, value):
         self._user = value
         if self._user is not None:
-            self.queryset = self._user.friends.all()
\ No newline at end of file
+            self.queryset = friendship_manager.friends(self._user)
+
+
+class FriendModelMultipleChoiceField(ModelMultipleChoiceField):
+    """Friends of user, submitted and cleaned by their user ids.
+
+    All the selected friends are fetched with a single query.
+    """
+
+    def __init__(self, user, **kwargs):
+        self._user = user
+        super().__init__(
+            queryset=None,
+            label='Select friends',
+            to_field_name='friend_id',
+            widget=CheckboxSelectMultiple(), **kwargs)
+
+    def label_from_instance(self, obj):
+        return obj.from_user.username
+
+    @property
+    def user(self):
+        return self._user
+
+    @user.setter
+    def user(self, value):
+        self._user = value
+        if self._user is not None:
+            self.queryset = friendship_manager.friends_by_username(self._user)
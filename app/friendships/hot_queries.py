@@ -0,0 +1,18 @@
+"""Queries behind the busiest pages, checked by `manage.py explain_queries`.
+
+Every entry maps a name to a callable building the queryset for a user id.
+"""
+from . import manager
+
+
+HOT_QUERIES = {
+    'friendships.friends': lambda user_id: (
+        manager.friends(user_id).order_by('-create_date')
+    ),
+    'friendships.requests': lambda user_id: (
+        manager.requests(user_id).order_by('-create_date')
+    ),
+    'friendships.sent_requests': lambda user_id: (
+        manager.sent_requests(user_id).order_by('-create_date')
+    ),
+}
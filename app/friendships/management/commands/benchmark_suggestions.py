@@ -0,0 +1,82 @@
+import random
+import statistics
+import time
+from array import array
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from friendships.suggestions import FriendGraph, count_mutual_friends
+
+
+class Command(BaseCommand):
+    help = (
+        'Time friend suggestions on a random graph held in memory, '
+        'or with --database on the stored friendships'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--edges', type=int, default=5_000_000)
+        parser.add_argument(
+            '--samples', type=int, default=1000,
+            help='Number of users suggestions are counted for'
+        )
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--database', action='store_true',
+            help='Run the grouped query for users from the database'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        if options['database']:
+            user_ids = list(
+                get_user_model().objects.values_list('pk', flat=True)
+            )
+            count = count_mutual_friends
+        else:
+            graph = self.build_graph(
+                rng, options['users'], options['edges']
+            )
+            user_ids = range(options['users'])
+            count = graph.count_mutual_friends
+
+        samples = rng.sample(user_ids, min(options['samples'], len(user_ids)))
+        timings = []
+        for user_id in samples:
+            started = time.perf_counter()
+            count(user_id, options['limit'])
+            timings.append(time.perf_counter() - started)
+        if not timings:
+            self.stdout.write("No users to count suggestions for")
+            return
+
+        timings.sort()
+        self.stdout.write(
+            f"Counted suggestions for {len(timings)} users: "
+            f"mean {statistics.mean(timings) * 1000:.2f}ms, "
+            f"p50 {timings[len(timings) // 2] * 1000:.2f}ms, "
+            f"p95 {timings[int(len(timings) * 0.95)] * 1000:.2f}ms, "
+            f"{len(timings) / sum(timings):.0f} users/s"
+        )
+
+    def build_graph(self, rng, users, edges):
+        # Random pairs may repeat, which is negligible for edges much fewer
+        # than users squared
+        started = time.perf_counter()
+        users1, users2 = array('l'), array('l')
+        while len(users1) < edges:
+            user1, user2 = rng.randrange(users), rng.randrange(users)
+            if user1 != user2:
+                users1.append(user1)
+                users2.append(user2)
+        generated = time.perf_counter()
+        graph = FriendGraph.from_edges(users, users1, users2)
+        self.stdout.write(
+            f"Generated {edges} friendships of {users} users in "
+            f"{generated - started:.1f}s, built the graph in "
+            f"{time.perf_counter() - generated:.1f}s"
+        )
+        return graph
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from friendships.models import Friend, Friendship, canonical_storage
+from friendships.storage import copy_to_canonical, copy_to_pairs
+
+
+class Command(BaseCommand):
+    help = (
+        'Replace the friendships of FRIENDSHIPS_STORAGE with those of the '
+        'other storage'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--noinput', '--no-input', action='store_false',
+            dest='interactive', help='Do not ask for confirmation'
+        )
+
+    def handle(self, *args, **options):
+        target = 'Friendship' if canonical_storage() else 'Friend'
+        if options['interactive']:
+            answer = input(
+                f"Every {target} row will be replaced. Type 'yes' to "
+                f"continue: "
+            )
+            if answer != 'yes':
+                raise CommandError("Copy cancelled")
+
+        with transaction.atomic():
+            if canonical_storage():
+                copy_to_canonical(Friend, Friendship, options['batch_size'])
+            else:
+                copy_to_pairs(Friend, Friendship, options['batch_size'])
+        self.stdout.write(
+            f"Friend rows: {Friend.objects.count()}, "
+            f"Friendship rows: {Friendship.objects.count()}"
+        )
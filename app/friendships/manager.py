@@ -1,11 +1,48 @@
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
 
-from .models import Friend, FriendshipRequest
+from django.db.models import Case, F, Q, When
+
+from .cache import get_friend_ids
+from .models import Friend, Friendship, FriendshipRequest, canonical_storage
 
 
 def friends(user):
-    return Friend.objects.select_related('from_user').filter(to_user=user)
+    """Friendships of user, whichever the storage.
+
+    Each one has the friend as from_user, user as to_user, the friend's id
+    as friend_id and a create_date.
+    """
+    if canonical_storage():
+        return Friendship.objects.of(user).select_related(
+            'user_low', 'user_high'
+        )
+    return (
+        Friend.objects.select_related('from_user').filter(to_user=user)
+        .annotate(friend_id=F('from_user_id'))
+    )
+
+
+def friends_by_username(user):
+    """Friendships of user ordered by the username of the friend."""
+    if canonical_storage():
+        pk = _pk(user)
+        return friends(user).order_by(Case(
+            When(user_low=pk, then=F('user_high__username')),
+            default=F('user_low__username')
+        ))
+    return friends(user).order_by('from_user__username')
+
+
+def friendship(user, username):
+    """Friendships of user with the user named username, one at most."""
+    if canonical_storage():
+        pk = _pk(user)
+        return friends(user).filter(
+            Q(user_low=pk, user_high__username=username) |
+            Q(user_high=pk, user_low__username=username)
+        )
+    return friends(user).filter(from_user__username=username)
 
 
 def requests(user):
@@ -20,12 +57,18 @@ def sent_requests(user):
     ).filter(from_user=user)
 
 
+def _pk(user):
+    return getattr(user, 'pk', user)
+
+
 def are_friends(user1, user2):
-    try:
-        Friend.objects.get(from_user=user1, to_user=user2)
-        return True
-    except Friend.DoesNotExist:
-        return False
+    return _pk(user2) in get_friend_ids(_pk(user1))
+
+
+def friends_among(user, others):
+    """Return the set of ids of the others who are friends of user."""
+    friend_ids = get_friend_ids(_pk(user))
+    return {_pk(other) for other in others if _pk(other) in friend_ids}
 
 
 def add_friend(from_user, to_user, message=""):
@@ -43,4 +86,6 @@ def add_friend(from_user, to_user, message=""):
 
 
 def remove_friend(from_user, to_user):
-    return Friend.objects.get(from_user=from_user, to_user=to_user).delete()
\ No newline at end of file
+    if canonical_storage():
+        return Friendship.objects.between(from_user, to_user).get().delete()
+    return Friend.objects.get(from_user=from_user, to_user=to_user).delete()
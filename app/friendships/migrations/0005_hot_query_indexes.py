@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 01:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('friendships', '0004_rename_create_time_friend_create_date_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='friend',
+            index=models.Index(fields=['to_user', 'create_date'], name='friend_to_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendshiprequest',
+            index=models.Index(fields=['to_user', 'create_date'], name='friendship_request_to_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='friendshiprequest',
+            index=models.Index(fields=['from_user', 'create_date'], name='friendship_request_from_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.db import migrations
+
+
+# Friendships are copied only into the storage in use: the other one isn't
+# kept up to date, see the copy_friendships command
+
+
+def copy_to_canonical(apps, schema_editor):
+    if settings.FRIENDSHIPS_STORAGE != 'canonical':
+        return
+    from friendships.storage import copy_to_canonical
+    copy_to_canonical(
+        apps.get_model('friendships', 'Friend'),
+        apps.get_model('friendships', 'Friendship')
+    )
+
+
+def copy_to_pairs(apps, schema_editor):
+    if settings.FRIENDSHIPS_STORAGE != 'canonical':
+        return
+    from friendships.storage import copy_to_pairs
+    copy_to_pairs(
+        apps.get_model('friendships', 'Friend'),
+        apps.get_model('friendships', 'Friendship')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('friendships', '0006_friendship'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_to_canonical, copy_to_pairs),
+    ]
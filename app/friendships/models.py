@@ -2,22 +2,32 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError, models
-from django.db.models import Q
+from django.db.models import Case, F, Q, When
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import get_friend_ids, invalidate_friend_ids
 
 
 AUTH_USER_MODEL = getattr(settings, 'AUTH_USER_MODEL', 'auth.User')
 
 
+def canonical_storage():
+    """Whether friendships are stored as single Friendship rows.
+
+    See the FRIENDSHIPS_STORAGE setting. Otherwise each friendship is
+    a pair of Friend rows, one per direction.
+    """
+    return settings.FRIENDSHIPS_STORAGE == 'canonical'
+
+
 class FriendshipUser(get_user_model()):
     class Meta:
         proxy = True
 
     def are_friends(self, other):
-        try:
-            Friend.objects.get(from_user=self, to_user=other)
-            return True
-        except Friend.DoesNotExist:
-            return False
+        return other.pk in get_friend_ids(self.pk)
 
     def add_friend(self, other):
         if self.are_friends(other):
@@ -33,7 +43,10 @@ class FriendshipUser(get_user_model()):
             )
 
     def remove_friend(self, to_user):
-        friend = Friend.objects.get(from_user=self, to_user=to_user)
+        if canonical_storage():
+            friend = Friendship.objects.between(self, to_user).get()
+        else:
+            friend = Friend.objects.get(from_user=self, to_user=to_user)
         friend.delete()
 
 class FriendshipRequest(models.Model):
@@ -57,6 +70,16 @@ class FriendshipRequest(models.Model):
                 name='unique_friendship_request'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['to_user', 'create_date'],
+                name='friendship_request_to_idx'
+            ),
+            models.Index(
+                fields=['from_user', 'create_date'],
+                name='friendship_request_from_idx'
+            ),
+        ]
 
     class AlreadyExists(Exception):
         pass
@@ -76,7 +99,12 @@ class FriendshipRequest(models.Model):
         super().save(*args, **kwargs)
 
     def accept(self):
-        Friend.objects.create(from_user=self.from_user, to_user=self.to_user)
+        if canonical_storage():
+            Friendship.objects.create_between(self.from_user, self.to_user)
+        else:
+            Friend.objects.create(
+                from_user=self.from_user, to_user=self.to_user
+            )
 
         self.delete()
 
@@ -93,7 +121,7 @@ class Friend(models.Model):
     to_user = models.ForeignKey(
         AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='friends'
     )
-    create_date = models.DateTimeField(auto_now_add=True)
+    create_date = models.DateTimeField(default=timezone.now)
 
     class Meta:
         constraints = [
@@ -102,6 +130,12 @@ class Friend(models.Model):
                 name='unique_friend'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['to_user', 'create_date'],
+                name='friend_to_user_idx'
+            )
+        ]
 
     class AlreadyExists(Exception):
         pass
@@ -127,3 +161,111 @@ class Friend(models.Model):
             Q(from_user=self.from_user, to_user=self.to_user) |
             Q(from_user=self.to_user, to_user=self.from_user)
         ).delete()
+
+
+def _pk(user):
+    return getattr(user, 'pk', user)
+
+
+class FriendshipQuerySet(models.QuerySet):
+    def of(self, user):
+        """Friendships of user, annotated with the id of the friend."""
+        pk = _pk(user)
+        return self.filter(Q(user_low=pk) | Q(user_high=pk)).annotate(
+            friend_id=Case(
+                When(user_low=pk, then=F('user_high')),
+                default=F('user_low')
+            )
+        )
+
+    def between(self, user1, user2):
+        low, high = sorted((_pk(user1), _pk(user2)))
+        return self.filter(user_low=low, user_high=high)
+
+    def create_between(self, user1, user2):
+        low, high = sorted((_pk(user1), _pk(user2)))
+        return self.create(user_low_id=low, user_high_id=high)
+
+
+class Friendship(models.Model):
+    """A friendship stored once for both users, the lower id first.
+
+    Fetched through FriendshipQuerySet.of(), a friendship is seen from the
+    side of the given user: from_user is the friend and to_user the user,
+    as with the Friend row of that user.
+    """
+    user_low = models.ForeignKey(
+        AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+'
+    )
+    user_high = models.ForeignKey(
+        AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+'
+    )
+    # Not auto_now_add, so friendships copied from Friend rows keep it
+    create_date = models.DateTimeField(default=timezone.now)
+
+    objects = FriendshipQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user_low', 'user_high'],
+                name='unique_friendship'
+            ),
+            models.CheckConstraint(
+                check=Q(user_low__lt=F('user_high')),
+                name='friendship_user_order'
+            ),
+        ]
+        indexes = [
+            # Friendships of the higher side, the lower one is looked up
+            # by the unique_friendship index
+            models.Index(
+                fields=['user_high', 'create_date'],
+                name='friendship_user_high_idx'
+            )
+        ]
+
+    AlreadyExists = Friend.AlreadyExists
+
+    def __str__(self):
+        return (
+            f'User #{self.user_low_id} is friend with user #{self.user_high_id}'
+        )
+
+    @property
+    def from_user_id(self):
+        return self.friend_id
+
+    @property
+    def from_user(self):
+        if self.user_high_id == self.friend_id:
+            return self.user_high
+        return self.user_low
+
+    @property
+    def to_user(self):
+        if self.user_high_id == self.friend_id:
+            return self.user_low
+        return self.user_high
+
+    def clean(self):
+        if self.user_low_id == self.user_high_id:
+            raise ValidationError("Users can't be friends with themselves")
+
+    def save(self, *args, **kwargs):
+        self.clean()
+        if self.user_low_id > self.user_high_id:
+            self.user_low, self.user_high = self.user_high, self.user_low
+        super().save(*args, **kwargs)
+
+
+# Signals rather than save() and delete(), so that cascades and queryset
+# deletes, e.g. by the admin, invalidate too
+@receiver([post_save, post_delete], sender=Friend)
+def invalidate_friend(sender, instance, **kwargs):
+    invalidate_friend_ids(instance.from_user_id, instance.to_user_id)
+
+
+@receiver([post_save, post_delete], sender=Friendship)
+def invalidate_friendship(sender, instance, **kwargs):
+    invalidate_friend_ids(instance.user_low_id, instance.user_high_id)
@@ -0,0 +1,63 @@
+"""Copying of friendships between the two storages.
+
+The functions take the model classes, so migrations can pass their
+historical ones. The target storage is emptied first, so it ends up
+holding exactly the friendships of the source one, and friendships
+removed since an earlier copy don't come back.
+"""
+
+
+def _iterate(queryset, fields, batch_size):
+    last_pk = 0
+    while True:
+        rows = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', *fields)[:batch_size]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        yield [row[1:] for row in rows]
+
+
+def copy_to_canonical(friend_model, friendship_model, batch_size=1000):
+    """Replace the Friendship rows with one for every pair of Friend rows."""
+    friendship_model.objects.all().delete()
+    for rows in _iterate(
+        friend_model.objects, ('from_user_id', 'to_user_id', 'create_date'),
+        batch_size
+    ):
+        # Both rows of a pair give the same friendship, the second one is
+        # ignored as a conflict
+        friendship_model.objects.bulk_create(
+            [
+                friendship_model(
+                    user_low_id=min(from_user_id, to_user_id),
+                    user_high_id=max(from_user_id, to_user_id),
+                    create_date=create_date
+                )
+                for from_user_id, to_user_id, create_date in rows
+            ],
+            ignore_conflicts=True
+        )
+
+
+def copy_to_pairs(friend_model, friendship_model, batch_size=1000):
+    """Replace the Friend rows with the two of every Friendship row."""
+    friend_model.objects.all().delete()
+    for rows in _iterate(
+        friendship_model.objects,
+        ('user_low_id', 'user_high_id', 'create_date'),
+        batch_size
+    ):
+        friend_model.objects.bulk_create(
+            [
+                friend_model(
+                    from_user_id=from_user_id, to_user_id=to_user_id,
+                    create_date=create_date
+                )
+                for low, high, create_date in rows
+                for from_user_id, to_user_id in ((low, high), (high, low))
+            ],
+            ignore_conflicts=True
+        )
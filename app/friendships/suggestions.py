@@ -0,0 +1,177 @@
+"""People you may know: users ranked by their mutual friends with a user.
+
+Suggestions are counted by one grouped query joining the friendships of
+the user's friends. They are cached under a key made of the friendships
+versions of the user and of every friend, so a change to any of those
+friendships, and only such a change, makes the user's suggestions be
+counted again. Like friend ids, they are only cached with the
+FRIENDSHIPS_CACHE setting on.
+
+FriendGraph counts suggestions from adjacency arrays instead, for jobs
+computing them for many users of a large graph at once.
+"""
+import hashlib
+import heapq
+from array import array
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Case, Count, F, Q, When
+
+from .cache import get_friend_ids, get_versions
+from .models import Friend, Friendship, canonical_storage
+
+
+# Suggestions counted and cached for each user, more than any page shows
+CACHED_SUGGESTIONS = 50
+
+
+def count_mutual_friends(user_id, limit):
+    """Return (user id, mutual friends count) pairs, most mutual first.
+
+    Only users who are not friends of user_id are counted.
+    """
+    if canonical_storage():
+        friend_ids = Friendship.objects.of(user_id).values('friend_id')
+        rows = (
+            Friendship.objects
+            .filter(Q(user_low__in=friend_ids) | Q(user_high__in=friend_ids))
+            # The other side of the friendship of a friend
+            .annotate(candidate_id=Case(
+                When(user_low__in=friend_ids, then=F('user_high')),
+                default=F('user_low')
+            ))
+            .values('candidate_id')
+        )
+        candidate = 'candidate_id'
+    else:
+        friend_ids = (
+            Friend.objects.filter(to_user_id=user_id).values('from_user_id')
+        )
+        rows = (
+            Friend.objects.filter(to_user_id__in=friend_ids)
+            .values('from_user_id')
+        )
+        candidate = 'from_user_id'
+
+    rows = (
+        rows.exclude(**{candidate: user_id})
+        .exclude(**{f'{candidate}__in': friend_ids})
+        .annotate(mutual_friends=Count('pk'))
+        .order_by('-mutual_friends', candidate)
+        .values_list(candidate, 'mutual_friends')
+    )
+    return list(rows[:limit])
+
+
+def _get_cache_key(user_id):
+    friend_ids = get_friend_ids(user_id)
+    versions = get_versions([user_id, *friend_ids])
+    digest = hashlib.sha256(
+        repr(sorted(versions.items())).encode()
+    ).hexdigest()
+    storage = settings.FRIENDSHIPS_STORAGE
+    return f'friendships:suggestions:{storage}:{user_id}:{digest}'
+
+
+def suggest_friends(user, limit=10, exclude=()):
+    """Return up to limit users user may know, most mutual friends first.
+
+    Users with ids in exclude are left out. Each user has the count set
+    as mutual_friends.
+    """
+    if settings.FRIENDSHIPS_CACHE:
+        key = _get_cache_key(user.pk)
+        counts = cache.get(key)
+        if counts is None:
+            counts = count_mutual_friends(user.pk, CACHED_SUGGESTIONS)
+            cache.set(key, counts, settings.FRIENDSHIPS_CACHE_TIMEOUT)
+    else:
+        counts = count_mutual_friends(user.pk, CACHED_SUGGESTIONS)
+
+    counts = [
+        (user_id, mutual_friends) for user_id, mutual_friends in counts
+        if user_id not in exclude
+    ][:limit]
+    users = get_user_model().objects.in_bulk(
+        [user_id for user_id, _ in counts]
+    )
+    suggestions = []
+    for user_id, mutual_friends in counts:
+        if user_id in users:
+            users[user_id].mutual_friends = mutual_friends
+            suggestions.append(users[user_id])
+    return suggestions
+
+
+class FriendGraph:
+    """Friendships as compressed adjacency arrays indexed by user id.
+
+    The friends of user i are neighbors[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, offsets, neighbors):
+        self.offsets = offsets
+        self.neighbors = neighbors
+
+    @classmethod
+    def from_edges(cls, size, users1, users2):
+        """Build the graph of users 0 to size - 1.
+
+        The i-th friendship is between users1[i] and users2[i], each one
+        must be given once.
+        """
+        degrees = array('l', bytes(array('l').itemsize * (size + 1)))
+        for user1, user2 in zip(users1, users2):
+            degrees[user1 + 1] += 1
+            degrees[user2 + 1] += 1
+        for i in range(size):
+            degrees[i + 1] += degrees[i]
+        offsets = degrees
+
+        ends = array('l', offsets)
+        neighbors = array('l', bytes(array('l').itemsize * offsets[size]))
+        for user1, user2 in zip(users1, users2):
+            neighbors[ends[user1]] = user2
+            ends[user1] += 1
+            neighbors[ends[user2]] = user1
+            ends[user2] += 1
+        return cls(offsets, neighbors)
+
+    @classmethod
+    def load(cls):
+        """Build the graph of all the stored friendships."""
+        if canonical_storage():
+            edges = Friendship.objects.values_list('user_low', 'user_high')
+        else:
+            edges = Friend.objects.filter(
+                from_user__lt=F('to_user')
+            ).values_list('from_user', 'to_user')
+        size = get_user_model().objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        users1, users2 = array('l'), array('l')
+        for user1, user2 in edges.iterator():
+            users1.append(user1)
+            users2.append(user2)
+        return cls.from_edges(size + 1, users1, users2)
+
+    def friends(self, user_id):
+        return self.neighbors[
+            self.offsets[user_id]:self.offsets[user_id + 1]
+        ]
+
+    def count_mutual_friends(self, user_id, limit):
+        """Same as the module's count_mutual_friends()."""
+        friends = self.friends(user_id)
+        counts = Counter()
+        for friend_id in friends:
+            counts.update(self.friends(friend_id))
+        counts.pop(user_id, None)
+        for friend_id in friends:
+            counts.pop(friend_id, None)
+        return heapq.nsmallest(
+            limit, counts.items(), key=lambda item: (-item[1], item[0])
+        )
@@ -1,12 +1,19 @@
+import io
 from xml.dom.minidom import parseString
 from django.db.utils import IntegrityError
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.test import TestCase, TransactionTestCase
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
 
 from . import manager as friendship_manager
-from .models import Friend, FriendshipRequest, FriendshipUser
+from .cache import get_friend_ids
+from .forms import FriendModelChoiceField, FriendModelMultipleChoiceField
+from .models import Friend, Friendship, FriendshipRequest, FriendshipUser
+from .storage import copy_to_canonical, copy_to_pairs
+from .suggestions import FriendGraph, count_mutual_friends, suggest_friends
 
 
 user_model = get_user_model()
@@ -563,3 +570,268 @@ class FriendshipRequestModelTest(TransactionTestCase):
             self.user1.sent_friendship_requests.all(),
             [self.friendship_request], 
         )
+
+
+@override_settings(FRIENDSHIPS_CACHE=True)
+class FriendIdsCacheTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user1, self.user2, self.user3 = create_bunch_of_test_users(3)
+        Friend.objects.create(from_user=self.user1, to_user=self.user2)
+
+    def test_are_friends_is_cached(self):
+        self.assertTrue(friendship_manager.are_friends(self.user1, self.user2))
+        with self.assertNumQueries(0):
+            self.assertTrue(
+                friendship_manager.are_friends(self.user1, self.user2)
+            )
+            self.assertFalse(
+                friendship_manager.are_friends(self.user1, self.user3)
+            )
+
+    def test_friends_among(self):
+        get_friend_ids(self.user1.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                friendship_manager.friends_among(
+                    self.user1, [self.user2, self.user3.pk]
+                ),
+                {self.user2.pk}
+            )
+
+    def test_save_invalidates(self):
+        self.assertFalse(friendship_manager.are_friends(self.user3, self.user1))
+        Friend.objects.create(from_user=self.user1, to_user=self.user3)
+        self.assertTrue(friendship_manager.are_friends(self.user3, self.user1))
+        self.assertTrue(friendship_manager.are_friends(self.user1, self.user3))
+
+    def test_delete_invalidates(self):
+        self.assertTrue(friendship_manager.are_friends(self.user2, self.user1))
+        Friend.objects.get(from_user=self.user2, to_user=self.user1).delete()
+        self.assertFalse(friendship_manager.are_friends(self.user2, self.user1))
+        self.assertFalse(friendship_manager.are_friends(self.user1, self.user2))
+
+    def test_queryset_delete_invalidates(self):
+        self.assertTrue(friendship_manager.are_friends(self.user2, self.user1))
+        # As the admin bulk action does
+        Friend.objects.filter(from_user=self.user1).delete()
+        self.assertFalse(friendship_manager.are_friends(self.user2, self.user1))
+
+    def test_cascade_delete_invalidates(self):
+        self.assertTrue(friendship_manager.are_friends(self.user1, self.user2))
+        self.user2.delete()
+        self.assertFalse(get_friend_ids(self.user1.pk))
+
+    @override_settings(FRIENDSHIPS_CACHE=False)
+    def test_not_cached_when_disabled(self):
+        friendship_manager.are_friends(self.user1, self.user2)
+        with self.assertNumQueries(1):
+            self.assertTrue(
+                friendship_manager.are_friends(self.user1, self.user2)
+            )
+
+    def test_accept_invalidates(self):
+        user3 = FriendshipUser.objects.get(pk=self.user3.pk)
+        self.assertFalse(user3.are_friends(self.user1))
+        FriendshipRequest.objects.create(
+            from_user=self.user1, to_user=self.user3
+        ).accept()
+        self.assertTrue(user3.are_friends(self.user1))
+
+
+@override_settings(FRIENDSHIPS_STORAGE='canonical', FRIENDSHIPS_CACHE=True)
+class CanonicalStorageTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user1, self.user2, self.user3 = create_bunch_of_test_users(3)
+        FriendshipRequest.objects.create(
+            from_user=self.user2, to_user=self.user1
+        ).accept()
+
+    def test_accept_stores_one_row(self):
+        self.assertFalse(Friend.objects.exists())
+        friendship = Friendship.objects.get()
+        self.assertEqual(
+            (friendship.user_low, friendship.user_high),
+            (self.user1, self.user2)
+        )
+        self.assertTrue(friendship_manager.are_friends(self.user1, self.user2))
+        self.assertTrue(friendship_manager.are_friends(self.user2, self.user1))
+
+    def test_friends_are_seen_from_user_side(self):
+        for user, friend in (
+            (self.user1, self.user2), (self.user2, self.user1)
+        ):
+            friendship = friendship_manager.friends(user).get()
+            self.assertEqual(friendship.from_user, friend)
+            self.assertEqual(friendship.from_user_id, friend.pk)
+            self.assertEqual(friendship.to_user, user)
+
+        self.client.force_login(self.user2)
+        response = self.client.get(reverse('friendships:index'))
+        self.assertContains(response, f'@{self.user1.username}')
+
+    def test_create_between_orders_users(self):
+        friendship = Friendship.objects.create_between(self.user3, self.user1)
+        self.assertEqual(friendship.user_low, self.user1)
+        self.assertEqual(friendship.user_high, self.user3)
+        with self.assertRaises(IntegrityError):
+            Friendship.objects.create_between(self.user1, self.user3)
+
+    def test_delete_view(self):
+        self.client.force_login(self.user2)
+        url = reverse('friendships:delete', args=(self.user1.username,))
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Friendship.objects.exists())
+        self.assertFalse(friendship_manager.are_friends(self.user1, self.user2))
+
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_friend_choice_fields(self):
+        Friendship.objects.create_between(self.user1, self.user3)
+        field = FriendModelMultipleChoiceField(user=None)
+        field.user = self.user1
+        self.assertEqual(
+            [friendship.from_user for friendship in field.queryset],
+            [self.user2, self.user3]
+        )
+        friendships = field.clean([self.user3.pk, self.user2.pk])
+        self.assertEqual(
+            {friendship.from_user_id for friendship in friendships},
+            {self.user2.pk, self.user3.pk}
+        )
+
+        field = FriendModelChoiceField(user=None)
+        field.user = self.user3
+        self.assertEqual(
+            field.clean(field.queryset.get().pk).from_user, self.user1
+        )
+
+    def test_copy_between_storages(self):
+        copy_to_pairs(Friend, Friendship)
+        self.assertEqual(Friend.objects.count(), 2)
+        Friendship.objects.all().delete()
+
+        copy_to_canonical(Friend, Friendship)
+        friendship = Friendship.objects.get()
+        self.assertEqual(
+            (friendship.user_low, friendship.user_high),
+            (self.user1, self.user2)
+        )
+        self.assertEqual(
+            friendship.create_date, Friend.objects.first().create_date
+        )
+
+
+@override_settings(FRIENDSHIPS_CACHE=True)
+class SwitchStorageTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user1, self.user2 = create_bunch_of_test_users(2)
+        Friend.objects.create(from_user=self.user1, to_user=self.user2)
+
+    def copy(self):
+        call_command(
+            'copy_friendships', interactive=False, stdout=io.StringIO()
+        )
+
+    def test_copy_replaces_target(self):
+        self.assertFalse(Friendship.objects.exists())
+        with override_settings(FRIENDSHIPS_STORAGE='canonical'):
+            self.copy()
+        self.assertTrue(
+            Friendship.objects.between(self.user1, self.user2).exists()
+        )
+
+        friendship_manager.remove_friend(self.user1, self.user2)
+        with override_settings(FRIENDSHIPS_STORAGE='canonical'):
+            self.copy()
+            self.assertFalse(Friendship.objects.exists())
+            self.assertFalse(
+                friendship_manager.are_friends(self.user1, self.user2)
+            )
+
+    def test_cached_ids_are_per_storage(self):
+        self.assertTrue(friendship_manager.are_friends(self.user1, self.user2))
+        with override_settings(FRIENDSHIPS_STORAGE='canonical'):
+            self.assertFalse(
+                friendship_manager.are_friends(self.user1, self.user2)
+            )
+
+
+@override_settings(FRIENDSHIPS_CACHE=True)
+class FriendSuggestionsTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.users = list(create_bunch_of_test_users(6))
+        user1, user2, user3, user4, user5, user6 = self.users
+        # user5 shares two friends with user1, user4 and user6 one
+        for from_user, to_user in (
+            (user1, user2), (user1, user3), (user2, user4),
+            (user2, user5), (user3, user5), (user3, user6),
+            (user2, user3),
+        ):
+            self.befriend(from_user, to_user)
+
+    def befriend(self, user1, user2):
+        Friend.objects.create(from_user=user1, to_user=user2)
+
+    def test_ranked_by_mutual_friends(self):
+        user1, _, _, user4, user5, user6 = self.users
+        self.assertEqual(
+            count_mutual_friends(user1.pk, 10),
+            [(user5.pk, 2), (user4.pk, 1), (user6.pk, 1)]
+        )
+        suggestions = suggest_friends(user1, limit=2)
+        self.assertEqual(suggestions, [user5, user4])
+        self.assertEqual(suggestions[0].mutual_friends, 2)
+        self.assertEqual(
+            suggest_friends(user1, exclude={user4.pk}), [user5, user6]
+        )
+
+    def test_graph_matches_query(self):
+        graph = FriendGraph.load()
+        for user in self.users:
+            self.assertEqual(
+                graph.count_mutual_friends(user.pk, 10),
+                count_mutual_friends(user.pk, 10)
+            )
+
+    def test_cached_until_friendships_change(self):
+        user1, _, user3, user4, user5, user6 = self.users
+        suggest_friends(user1)
+        with self.assertNumQueries(1):
+            # Only the users are fetched
+            suggest_friends(user1)
+
+        # A new friend of a friend
+        user7 = user_model.objects.create(username='user7')
+        self.befriend(user3, user7)
+        self.assertIn(user7, suggest_friends(user1))
+
+        self.befriend(user1, user5)
+        self.assertEqual(suggest_friends(user1), [user4, user6, user7])
+
+    def test_index_view(self):
+        self.client.force_login(self.users[0])
+        FriendshipRequest.objects.create(
+            from_user=self.users[0], to_user=self.users[3]
+        )
+        response = self.client.get(reverse('friendships:index'))
+        self.assertEqual(
+            response.context['friend_suggestions'],
+            [self.users[4], self.users[5]]
+        )
+        self.assertContains(response, '2 mutual friends')
+
+
+@override_settings(FRIENDSHIPS_STORAGE='canonical')
+class CanonicalFriendSuggestionsTest(FriendSuggestionsTest):
+    def befriend(self, user1, user2):
+        Friendship.objects.create_between(user1, user2)
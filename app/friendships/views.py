@@ -2,6 +2,7 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.forms import Form
 from django.http import HttpResponseRedirect
+from django.shortcuts import get_object_or_404
 from django.urls import reverse_lazy
 from django.views.generic import View, DeleteView, DetailView, ListView, TemplateView
 from django.views.generic.detail import SingleObjectMixin, SingleObjectTemplateResponseMixin
@@ -10,7 +11,8 @@ from django.views.generic.edit import FormMixin, ProcessFormView
 from . import manager as friendships_manager
 from .forms import FriendshipRequestForm
 from .mixins import UserIsFriendshipRequestReceiverTestMixin
-from .models import Friend, FriendshipRequest
+from .models import FriendshipRequest
+from .suggestions import suggest_friends
 
 
 user_model = get_user_model()
@@ -18,6 +20,7 @@ user_model = get_user_model()
 
 class FriendIndexView(LoginRequiredMixin, TemplateView):
     template_name = 'friendships/index.html'
+    suggestions_limit = 5
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -33,8 +36,21 @@ class FriendIndexView(LoginRequiredMixin, TemplateView):
             friendships_manager.sent_requests(self.request.user)
             .order_by('-create_date')
         )
+        context['friend_suggestions'] = self.get_friend_suggestions(
+            context['friend_requests'], context['sent_friend_requests']
+        )
         return context
 
+    def get_friend_suggestions(self, friend_requests, sent_friend_requests):
+        # Users with a pending request either way are listed already
+        requested_ids = (
+            {request.from_user_id for request in friend_requests} |
+            {request.to_user_id for request in sent_friend_requests}
+        )
+        return suggest_friends(
+            self.request.user, self.suggestions_limit, exclude=requested_ids
+        )
+
 
 class FriendListView(LoginRequiredMixin, ListView):
     template_name = 'friendships/list.html'
@@ -88,11 +104,11 @@ class FriendshipRequestCreateView(
 class FriendDeleteView(LoginRequiredMixin, DeleteView):
     template_name = 'friendships/delete.html'
     success_url = reverse_lazy('friendships:index')
-    slug_field = 'to_user__username'
-    slug_url_kwarg = 'username'
 
-    def get_queryset(self):
-        return Friend.objects.filter(from_user=self.request.user)
+    def get_object(self, queryset=None):
+        return get_object_or_404(friendships_manager.friendship(
+            self.request.user, self.kwargs['username']
+        ))
     
 
 class FriendshipRequestListView(LoginRequiredMixin, ListView):
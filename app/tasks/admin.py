@@ -4,7 +4,10 @@ from .models import Task, TaskShare, TaskNotification
 
 
 class TaskAdmin(admin.ModelAdmin):
-    readonly_fields = ['create_date']
+    list_display = ['title', 'author', 'status', 'expire_date']
+    list_filter = ['status']
+    raw_id_fields = ['author']
+    readonly_fields = ['create_date', 'status']
 
 
 admin.site.register(Task, TaskAdmin)
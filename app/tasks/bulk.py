@@ -0,0 +1,107 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Task, TaskShare
+
+
+COMPLETED = 'completed'
+DELETED = 'deleted'
+REPEATED = 'repeated'
+SKIPPED = 'skipped'
+NOT_FOUND = 'not_found'
+
+
+def _authorize(user, ids, now):
+    """Fetch all the user's tasks among ids with a single query.
+
+    Ids of foreign or missing tasks are reported as not found alike.
+    """
+    tasks = (
+        Task.objects.filter(author=user, pk__in=ids)
+        .with_status(now)
+        .in_bulk()
+    )
+    results = {pk: NOT_FOUND for pk in ids if pk not in tasks}
+    return tasks, results
+
+
+def complete_tasks(user, ids):
+    now = timezone.now()
+    tasks, results = _authorize(user, ids, now)
+
+    completed = []
+    for task in tasks.values():
+        if task.done:
+            results[task.id] = SKIPPED
+            continue
+        task.done = True
+        task.done_date = now
+        task.status = Task.Status.DONE
+        completed.append(task)
+        results[task.id] = COMPLETED
+
+    with transaction.atomic():
+        Task.objects.bulk_update(completed, ['done', 'done_date', 'status'])
+        TaskShare.objects.filter(task__in=completed, done=False).update(
+            done=True, done_date=now
+        )
+    return results
+
+
+def delete_tasks(user, ids):
+    tasks = Task.objects.filter(author=user, pk__in=ids)
+    found = set(tasks.values_list('id', flat=True))
+    tasks.filter(pk__in=found).delete()
+    return {pk: DELETED if pk in found else NOT_FOUND for pk in ids}
+
+
+def repeat_tasks(user, ids):
+    now = timezone.now()
+    tasks, results = _authorize(user, ids, now)
+
+    repeated = []
+    for task in tasks.values():
+        if task.current_status == Task.Status.ACTIVE:
+            results[task.id] = SKIPPED
+            continue
+        expire_date = None
+        if task.expire_date is not None:
+            # Keep the time the original task was given
+            expire_date = now + (task.expire_date - task.create_date)
+        repeated.append(Task(
+            title=task.title,
+            author_id=task.author_id,
+            comment=task.comment,
+            expire_date=expire_date
+        ))
+        results[task.id] = REPEATED
+
+    Task.objects.bulk_create(repeated)
+    return results
+
+
+def share_task(task, from_user, to_user_ids, comment=''):
+    """Share task with all the users in one insert.
+
+    The author and users the task is already shared with are left out.
+    Returns ids of the users the task was not shared with yet, which may
+    include users a concurrent share of the task has just reached.
+    """
+    shared = set(
+        task.shares.filter(to_user__in=to_user_ids)
+        .values_list('to_user_id', flat=True)
+    )
+    shared.add(task.author_id)
+    shares = [
+        TaskShare(
+            task=task,
+            from_user=from_user,
+            to_user_id=to_user_id,
+            comment=comment
+        )
+        for to_user_id in dict.fromkeys(to_user_ids)
+        if to_user_id not in shared
+    ]
+    # A concurrent share of the same task is skipped by unique_task_share
+    TaskShare.objects.bulk_create(shares, ignore_conflicts=True)
+    return [share.to_user_id for share in shares]
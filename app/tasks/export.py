@@ -0,0 +1,94 @@
+import csv
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import TaskShare
+
+
+CHUNK_SIZE = 2000
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+COLUMNS = [
+    'record', 'id', 'task_id', 'author', 'title', 'comment', 'create_date',
+    'expire_date', 'done', 'done_date', 'from_user', 'to_user',
+]
+
+_TASK_VALUES = {
+    'id': 'id',
+    'author': 'author__username',
+    'title': 'title',
+    'comment': 'comment',
+    'create_date': 'create_date',
+    'expire_date': 'expire_date',
+    'done': 'done',
+    'done_date': 'done_date',
+}
+
+_SHARE_VALUES = {
+    'id': 'id',
+    'task_id': 'task_id',
+    'comment': 'comment',
+    'done': 'done',
+    'done_date': 'done_date',
+    'from_user': 'from_user__username',
+    'to_user': 'to_user__username',
+}
+
+
+def _iter_values(queryset, values, record, chunk_size):
+    rows = queryset.order_by('id').values_list(*values.values())
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield {'record': record, **dict(zip(values, row))}
+
+
+def iter_records(tasks, chunk_size=CHUNK_SIZE):
+    """Yield the tasks and then the shares of these tasks as flat dicts.
+
+    Rows are fetched with a server-side cursor in chunks, so memory usage
+    does not depend on the number of exported tasks.
+    """
+    yield from _iter_values(tasks, _TASK_VALUES, 'task', chunk_size)
+    shares = TaskShare.objects.filter(task__in=tasks.values('id'))
+    yield from _iter_values(shares, _SHARE_VALUES, 'share', chunk_size)
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def iter_csv(records):
+    writer = csv.DictWriter(_Echo(), fieldnames=COLUMNS)
+    yield writer.writeheader()
+    for record in records:
+        yield writer.writerow(record)
+
+
+def iter_ndjson(records):
+    for record in records:
+        yield json.dumps(record, cls=DjangoJSONEncoder) + '\n'
+
+
+def iter_gzip(chunks):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(tasks, format='csv', compress=False, chunk_size=CHUNK_SIZE):
+    if format not in FORMATS:
+        raise ValueError(f"Unknown export format: {format}")
+
+    records = iter_records(tasks, chunk_size=chunk_size)
+    lines = iter_csv(records) if format == 'csv' else iter_ndjson(records)
+    chunks = (line.encode() for line in lines)
+    return iter_gzip(chunks) if compress else chunks
@@ -1,10 +1,15 @@
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.forms import (
-    CharField, Form, ModelForm, Textarea
+    CharField, ChoiceField, Field, FileField, Form, ModelForm,
+    MultipleHiddenInput, Textarea
 )
 
+from . import imports
 from .models import Task
-from friendships.forms import FriendModelChoiceField
+from friendships.forms import (
+    FriendModelChoiceField, FriendModelMultipleChoiceField
+)
 
 user_model = get_user_model()
 
@@ -28,3 +33,50 @@ class TaskShareForm(Form):
         super().clean()
         self.cleaned_data['to_username'] = \
             self.cleaned_data['to_username'].from_user.username
+
+
+class TaskBulkShareForm(Form):
+    to_users = FriendModelMultipleChoiceField(user=None)
+    comment = CharField(max_length=255, widget=Textarea(), required=False)
+
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+        self.fields['to_users'].user = self.user
+
+
+class TaskIdsField(Field):
+    widget = MultipleHiddenInput
+
+    def __init__(self, *, max_count=None, **kwargs):
+        self.max_count = max_count
+        super().__init__(**kwargs)
+
+    def to_python(self, value):
+        if not value:
+            return []
+        try:
+            ids = list(dict.fromkeys(int(v) for v in value))
+        except (TypeError, ValueError):
+            raise ValidationError('Task ids must be integers')
+        if self.max_count is not None and len(ids) > self.max_count:
+            raise ValidationError(
+                f'Select at most {self.max_count} tasks at once'
+            )
+        return ids
+
+
+class TaskBulkActionForm(Form):
+    action = ChoiceField(choices=[
+        ('complete', 'Complete'),
+        ('delete', 'Delete'),
+        ('repeat', 'Repeat'),
+    ])
+    ids = TaskIdsField(max_count=500)
+
+
+class TaskImportForm(Form):
+    file = FileField()
+    format = ChoiceField(choices=[
+        (format, format.upper()) for format in imports.FORMATS
+    ])
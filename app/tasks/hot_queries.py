@@ -0,0 +1,27 @@
+"""Queries behind the busiest pages, checked by `manage.py explain_queries`.
+
+Every entry maps a name to a callable building the queryset for a user id,
+with the same queryset methods as the views so the checked plans are the
+ones served.
+"""
+from .models import Task, TaskShare
+from .views import TaskPaginationMixin
+
+
+def _task_page(status):
+    def query(user_id):
+        return (
+            Task.objects.filter(author_id=user_id).tab(status)
+            [:TaskPaginationMixin.paginate_by]
+        )
+    return query
+
+
+HOT_QUERIES = {
+    'tasks.active_page': _task_page(Task.Status.ACTIVE),
+    'tasks.done_page': _task_page(Task.Status.DONE),
+    'tasks.failed_page': _task_page(Task.Status.FAILED),
+    'tasks.shared_tasks': lambda user_id: (
+        TaskShare.objects.inbox(user_id)[:TaskPaginationMixin.paginate_by]
+    ),
+}
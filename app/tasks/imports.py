@@ -0,0 +1,263 @@
+import csv
+import io
+import json
+import re
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Task
+
+
+BATCH_SIZE = 1000
+
+# Characters of a single JSON row held in memory at most
+MAX_ROW_SIZE = 1024 * 1024
+
+FORMATS = ('csv', 'json')
+
+FIELDS = ('title', 'comment', 'expire_date', 'done', 'done_date')
+
+# Types of the JSON values accepted for each field, CSV values are strings
+FIELD_TYPES = {
+    'title': (str,),
+    'comment': (str,),
+    'expire_date': (str,),
+    'done': (bool, str),
+    'done_date': (str,),
+}
+
+BOOLEANS = {
+    'true': True, 't': True, 'yes': True, '1': True,
+    'false': False, 'f': False, 'no': False, '0': False,
+}
+
+
+class TaskImportError(Exception):
+    pass
+
+
+def iter_csv_rows(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.DictReader(text)
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise TaskImportError(f"Malformed CSV: {e}")
+    finally:
+        text.detach()
+
+
+# Characters that may end a JSON value, outside of and inside strings
+_JSON_OUTSIDE_STRING = re.compile(r'["{}\[\],\n]')
+_JSON_INSIDE_STRING = re.compile(r'["\\]')
+
+
+def iter_json_rows(stream, chunk_size=64 * 1024, max_row_size=MAX_ROW_SIZE):
+    """Incrementally parse a JSON array of objects or JSON lines.
+
+    Values are delimited by scanning for the comma, bracket or newline
+    that ends them before being decoded, so a malformed value is yielded
+    as a TaskImportError in place of its row and the following ones are
+    still read. Structural errors, like an unclosed array or a value
+    longer than max_row_size, stop the parsing.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig')
+    buffer = ''
+    # Start of the current value and how far it has been scanned
+    start = position = 0
+    depth = 0
+    in_string = False
+    in_array = None
+    eof = False
+    try:
+        while True:
+            value_end = None
+            if in_array is None:
+                stripped = buffer.lstrip()
+                if stripped:
+                    in_array = stripped.startswith('[')
+                    start = position = len(buffer) - len(stripped) + in_array
+                    continue
+            elif in_string:
+                match = _JSON_INSIDE_STRING.search(buffer, position)
+                if match is None:
+                    position = len(buffer)
+                elif match.group() == '"':
+                    in_string = False
+                    position = match.end()
+                    continue
+                elif match.end() < len(buffer):
+                    # Skip the escaped character
+                    position = match.end() + 1
+                    continue
+            else:
+                match = _JSON_OUTSIDE_STRING.search(buffer, position)
+                if match is None:
+                    position = len(buffer)
+                    if eof and not depth:
+                        value_end = len(buffer)
+                else:
+                    char = match.group()
+                    position = match.end()
+                    if char == '"':
+                        in_string = True
+                    elif char in '{[':
+                        depth += 1
+                    elif char in '}]' and depth:
+                        depth -= 1
+                    elif depth == 0 and (
+                        char in ',]' if in_array else char == '\n'
+                    ):
+                        value_end = match.start()
+                    if value_end is None:
+                        continue
+
+            if value_end is not None:
+                value = buffer[start:value_end].strip()
+                delimiter = buffer[value_end:value_end + 1]
+                start = position = value_end + 1
+                if value:
+                    try:
+                        yield json.loads(value)
+                    except json.JSONDecodeError as e:
+                        yield TaskImportError(f"Malformed JSON: {e}")
+                elif delimiter == ',':
+                    yield TaskImportError("Malformed JSON: missing value")
+                if not delimiter:
+                    if in_array:
+                        raise TaskImportError("Malformed JSON: unclosed array")
+                    return
+                if delimiter == ']':
+                    return
+                continue
+
+            if eof:
+                if in_array is None:
+                    return
+                raise TaskImportError("Malformed JSON: unexpected end")
+            if len(buffer) - start > max_row_size:
+                raise TaskImportError(
+                    f"Malformed JSON: row longer than {max_row_size} "
+                    f"characters"
+                )
+            chunk = text.read(chunk_size)
+            eof = not chunk
+            # Drop the values already read
+            buffer = buffer[start:] + chunk
+            position -= start
+            start = 0
+    except UnicodeDecodeError as e:
+        raise TaskImportError(f"Malformed JSON: {e}")
+    finally:
+        text.detach()
+
+
+def build_task(row, author, now):
+    """Validate a row with the same rules as Task.clean() without queries.
+
+    Returns a (task, errors) pair, where task is None for invalid rows.
+    """
+    if isinstance(row, TaskImportError):
+        # A row the parser couldn't read
+        return None, [str(row)]
+    if not isinstance(row, dict):
+        return None, ['Row must be an object']
+
+    values = {
+        field: row[field] for field in FIELDS
+        if row.get(field) not in (None, '')
+    }
+    errors = [
+        f'{field}: Invalid value {value!r}'
+        for field, value in values.items()
+        if not isinstance(value, FIELD_TYPES[field])
+    ]
+    if errors:
+        return None, errors
+    done = values.get('done')
+    if isinstance(done, str):
+        values['done'] = BOOLEANS.get(done.strip().lower(), done)
+    task = Task(author=author, **values)
+    # Title is required, the other missing fields keep their defaults
+    exclude = [
+        field.name for field in Task._meta.fields
+        if field.name not in values and field.name != 'title'
+    ]
+    try:
+        task.clean_fields(exclude=exclude)
+    except ValidationError as e:
+        return None, [
+            f'{field}: {message}'
+            for field, messages in e.message_dict.items()
+            for message in messages
+        ]
+
+    for field in ('expire_date', 'done_date'):
+        value = getattr(task, field)
+        if value is not None and timezone.is_naive(value):
+            setattr(task, field, timezone.make_aware(value))
+    if task.done and task.done_date is None:
+        task.done_date = now
+
+    try:
+        task.clean(now=now)
+    except ValidationError as e:
+        return None, e.messages
+    task.status = task.compute_status(now)
+    return task, []
+
+
+def import_tasks(rows, author, batch_size=BATCH_SIZE):
+    """Create tasks from an iterable of dicts in batches.
+
+    Every batch is validated in one pass against the same point in time
+    and inserted with a single bulk_create() in its own transaction, so
+    only one batch is held in memory. Invalid rows are skipped and
+    reported with their 1-based number, as are malformed rows the parser
+    yields as TaskImportError. A malformed file stops the import after the
+    rows read so far.
+    """
+    now = timezone.now()
+    report = {'created': 0, 'errors': []}
+
+    def flush(batch):
+        tasks = []
+        for number, row in batch:
+            task, errors = build_task(row, author, now)
+            if errors:
+                report['errors'].append({'row': number, 'errors': errors})
+            else:
+                tasks.append(task)
+        with transaction.atomic():
+            Task.objects.bulk_create(tasks)
+        report['created'] += len(tasks)
+
+    batch = []
+    number = 0
+    rows = iter(rows)
+    while True:
+        try:
+            row = next(rows)
+        except StopIteration:
+            break
+        except TaskImportError as e:
+            report['errors'].append({'row': number + 1, 'errors': [str(e)]})
+            break
+        number += 1
+        batch.append((number, row))
+        if len(batch) == batch_size:
+            flush(batch)
+            batch = []
+
+    if batch:
+        flush(batch)
+    return report
+
+
+def import_stream(stream, author, format='csv', batch_size=BATCH_SIZE):
+    if format not in FORMATS:
+        raise ValueError(f"Unknown import format: {format}")
+
+    rows = iter_csv_rows(stream) if format == 'csv' else iter_json_rows(stream)
+    return import_tasks(rows, author, batch_size=batch_size)
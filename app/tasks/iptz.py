@@ -0,0 +1,171 @@
+"""Offline IP address to timezone lookup.
+
+The table is a binary file built by the build_iptz_table command:
+
+    header   MAGIC, record count, name count and names size (uint32 each)
+    names    timezone names joined with newlines
+    records  sorted 16-byte IPv6 range starts, each followed by a uint16
+             index of the timezone name (NO_TIMEZONE for unknown ranges)
+
+IPv4 addresses are stored as IPv4-mapped IPv6 ones. A range lasts until
+the start of the next record. The records are never copied into Python
+objects: the file is memory-mapped and searched in place, so every worker
+process shares the same pages of the OS page cache.
+"""
+import ipaddress
+import logging
+import mmap
+import struct
+import threading
+import time
+
+from django.conf import settings
+
+
+MAGIC = b'IPTZ\x00\x01\x00\x00'
+HEADER = struct.Struct('>8sIII')
+RECORD = struct.Struct('>16sH')
+NO_TIMEZONE = 0xFFFF
+
+logger = logging.getLogger(__name__)
+
+
+def ip_key(ip):
+    """Return the 16-byte big-endian table key of an address."""
+    address = ipaddress.ip_address(ip)
+    if address.version == 4:
+        address = ipaddress.IPv6Address(f'::ffff:{address}')
+    return address.packed
+
+
+class InvalidTable(Exception):
+    pass
+
+
+class IPTimezoneTable:
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            try:
+                self._mmap = mmap.mmap(
+                    file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+            except ValueError:
+                raise InvalidTable(f"{path} is empty")
+        try:
+            magic, self.size, names_count, names_size = (
+                HEADER.unpack_from(self._mmap)
+            )
+        except struct.error:
+            raise InvalidTable(f"{path} is too short")
+        if magic != MAGIC:
+            raise InvalidTable(f"{path} is not a timezone table")
+
+        names = self._mmap[HEADER.size:HEADER.size + names_size]
+        self.names = names.decode().split('\n') if names_count else []
+        self._offset = HEADER.size + names_size
+        if len(self._mmap) != self._offset + self.size * RECORD.size:
+            raise InvalidTable(f"{path} is truncated")
+
+    def _key(self, i):
+        offset = self._offset + i * RECORD.size
+        return self._mmap[offset:offset + 16]
+
+    def lookup(self, ip):
+        """Return the timezone name of ip, or None if it is unknown."""
+        key = ip_key(ip)
+        # Find the last range starting at or before key
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) <= key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == 0:
+            return None
+
+        _, index = RECORD.unpack_from(
+            self._mmap, self._offset + (low - 1) * RECORD.size
+        )
+        return None if index == NO_TIMEZONE else self.names[index]
+
+    def close(self):
+        self._mmap.close()
+
+
+def write_table(file, ranges):
+    """Write (first ip, last ip, timezone name) ranges as a table.
+
+    Ranges must not overlap. Addresses between them get no timezone.
+    """
+    keys = []
+    for first, last, tzname in ranges:
+        first_key = int.from_bytes(ip_key(first), 'big')
+        last_key = int.from_bytes(ip_key(last), 'big')
+        if first_key > last_key:
+            # The search would silently give wrong answers
+            raise ValueError(f"Range {first} - {last} ends before it starts")
+        keys.append((first_key, last_key, tzname))
+    ranges = sorted(keys)
+    names = sorted({tzname for _, _, tzname in ranges})
+    if len(names) >= NO_TIMEZONE:
+        raise ValueError("Too many timezones")
+    indexes = {name: i for i, name in enumerate(names)}
+
+    records = []
+    end = None
+    for first, last, tzname in ranges:
+        if end is not None and first <= end:
+            raise ValueError(
+                f"Range starting at {ipaddress.ip_address(first)} overlaps "
+                f"the previous one"
+            )
+        if end is not None and first > end + 1:
+            records.append((end + 1, NO_TIMEZONE))
+        records.append((first, indexes[tzname]))
+        end = last
+    if end is not None and end < 2 ** 128 - 1:
+        records.append((end + 1, NO_TIMEZONE))
+
+    names = '\n'.join(names).encode()
+    file.write(HEADER.pack(MAGIC, len(records), len(indexes), len(names)))
+    file.write(names)
+    for start, index in records:
+        file.write(RECORD.pack(start.to_bytes(16, 'big'), index))
+    return len(records)
+
+
+# (path, table or None if it failed to load, load time)
+_table = None
+_table_lock = threading.Lock()
+
+
+def _is_loaded(path):
+    if _table is None or _table[0] != path:
+        return False
+    # Failed loads are retried like failed lookups, not on every request
+    return (
+        _table[1] is not None or
+        time.monotonic() - _table[2] < settings.IPTZ_FAILURE_CACHE_TIMEOUT
+    )
+
+
+def get_table():
+    """Return the table at IPTZ_TABLE_PATH, loaded once per process.
+
+    Returns None if there is no table or it can't be loaded.
+    """
+    global _table
+    path = getattr(settings, 'IPTZ_TABLE_PATH', None)
+    if not path:
+        return None
+    if not _is_loaded(path):
+        with _table_lock:
+            if not _is_loaded(path):
+                try:
+                    table = IPTimezoneTable(path)
+                except (OSError, InvalidTable) as e:
+                    logger.error("Can't load the timezone table: %s", e)
+                    table = None
+                _table = (path, table, time.monotonic())
+    return _table[1]
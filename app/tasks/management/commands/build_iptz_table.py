@@ -0,0 +1,52 @@
+import csv
+import ipaddress
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.iptz import write_table
+
+
+class Command(BaseCommand):
+    help = 'Build the IP to timezone lookup table from a CSV of ranges'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source',
+            help='CSV file with first IP, last IP and timezone name columns'
+        )
+        parser.add_argument('output', help='Path of the table to write')
+
+    def handle(self, *args, **options):
+        with open(options['source'], newline='') as source:
+            ranges = list(self.read_ranges(csv.reader(source)))
+
+        # Replace the table atomically: processes that have mapped the old
+        # file keep reading it until they reload
+        tmp_path = f"{options['output']}.tmp"
+        try:
+            with open(tmp_path, 'wb') as output:
+                count = write_table(output, ranges)
+        except ValueError as e:
+            os.remove(tmp_path)
+            raise CommandError(e)
+        os.replace(tmp_path, options['output'])
+
+        self.stdout.write(
+            f"Wrote {count} records for {len(ranges)} ranges "
+            f"to {options['output']}"
+        )
+
+    def read_ranges(self, rows):
+        for line, row in enumerate(rows, start=1):
+            try:
+                first, last, tzname = (value.strip() for value in row[:3])
+                ipaddress.ip_address(first)
+                ipaddress.ip_address(last)
+            except ValueError:
+                if line == 1:
+                    # Header
+                    continue
+                raise CommandError(f"Invalid range on line {line}: {row}")
+            if tzname:
+                yield first, last, tzname
@@ -0,0 +1,73 @@
+import re
+from importlib import import_module
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+
+# Plan lines meaning that a whole table is read or rows are sorted
+PLAN_PROBLEMS = {
+    'sqlite': [
+        re.compile(r'\bSCAN (?!.*\bUSING (COVERING )?INDEX\b)'),
+        re.compile(r'\bUSE TEMP B-TREE\b'),
+    ],
+    'postgresql': [
+        re.compile(r'\bSeq Scan\b'),
+        re.compile(r'\bSort\b'),
+    ],
+    'mysql': [
+        re.compile(r'\bALL\b'),
+        re.compile(r'\bUsing filesort\b'),
+    ],
+}
+
+
+def get_hot_queries():
+    """Collect HOT_QUERIES from the hot_queries module of every app."""
+    queries = {}
+    for app_config in apps.get_app_configs():
+        try:
+            module = import_module(f'{app_config.name}.hot_queries')
+        except ModuleNotFoundError as e:
+            if e.name != f'{app_config.name}.hot_queries':
+                raise
+            continue
+        queries.update(module.HOT_QUERIES)
+    return queries
+
+
+class Command(BaseCommand):
+    help = (
+        'Print the execution plan of every registered hot query and '
+        'report full table scans and sorts'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id', type=int, default=1,
+            help='User id the queries are built for'
+        )
+        parser.add_argument(
+            '--strict', action='store_true',
+            help='Exit with an error if any plan has a problem'
+        )
+
+    def handle(self, *args, **options):
+        patterns = PLAN_PROBLEMS.get(connection.vendor, [])
+        failed = []
+        for name, query in sorted(get_hot_queries().items()):
+            plan = query(options['user_id']).explain()
+            problems = [
+                line for line in plan.splitlines()
+                if any(pattern.search(line) for pattern in patterns)
+            ]
+            if problems:
+                failed.append(name)
+                self.stdout.write(self.style.WARNING(name))
+            else:
+                self.stdout.write(self.style.SUCCESS(name))
+            self.stdout.write(plan + '\n')
+
+        if failed and options['strict']:
+            raise CommandError(f"Problematic plans: {', '.join(failed)}")
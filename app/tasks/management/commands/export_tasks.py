@@ -0,0 +1,47 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.export import CHUNK_SIZE, FORMATS, stream_export
+from tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = 'Stream tasks and their shares as CSV or NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', help='Export only tasks of the user with this username'
+        )
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument(
+            '--gzip', action='store_true', help='Compress the output'
+        )
+        parser.add_argument(
+            '--output', help='Output file path (defaults to stdout)'
+        )
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        tasks = Task.objects.all()
+        if options['user']:
+            user_model = get_user_model()
+            try:
+                user = user_model.objects.get(username=options['user'])
+            except user_model.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist")
+            tasks = tasks.filter(author=user)
+
+        chunks = stream_export(
+            tasks,
+            format=options['format'],
+            compress=options['gzip'],
+            chunk_size=options['chunk_size']
+        )
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                output.writelines(chunks)
+        else:
+            sys.stdout.buffer.writelines(chunks)
+            sys.stdout.buffer.flush()
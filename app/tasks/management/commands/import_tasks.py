@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.imports import BATCH_SIZE, FORMATS, import_stream
+
+
+class Command(BaseCommand):
+    help = 'Create tasks for a user from a CSV or JSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path of the file to import')
+        parser.add_argument(
+            '--user', required=True, help='Username of the tasks author'
+        )
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        user_model = get_user_model()
+        try:
+            user = user_model.objects.get(username=options['user'])
+        except user_model.DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist")
+
+        path = options['path']
+        format = options['format'] or path.rsplit('.', 1)[-1].lower()
+        if format in ('ndjson', 'jsonl'):
+            format = 'json'
+        if format not in FORMATS:
+            raise CommandError(f"Unknown import format: {format}")
+
+        with open(path, 'rb') as stream:
+            report = import_stream(
+                stream, user, format=format,
+                batch_size=options['batch_size']
+            )
+
+        for row in report['errors']:
+            self.stderr.write(f"Row {row['row']}: {'; '.join(row['errors'])}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['created']} tasks, "
+            f"skipped {len(report['errors'])} rows"
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from tasks.search import SQLiteSearchBackend
+
+
+class Command(BaseCommand):
+    help = 'Recreate the full-text index of tasks and its triggers'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(
+                f"No full-text index is maintained on {connection.vendor}"
+            )
+        with transaction.atomic(), connection.cursor() as cursor:
+            SQLiteSearchBackend.install(cursor)
+        self.stdout.write("Search index rebuilt")
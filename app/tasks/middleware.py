@@ -1,25 +1,52 @@
+import pytz
 from django.utils import timezone
-from pytz import timezone as pytz_tz
 
-from .utils import get_client_ip, get_tzname_by_ip
+from .utils import detect_tzname, get_client_ip, get_timezone
 
 
 class UserTimezoneMiddleware:
+    """Activates the timezone of the user.
+
+    It is the one saved on the user, then the one reported by the browser
+    or detected by the IP address of the client. Detection never blocks
+    the request: until the timezone is known the default one is used.
+    A detected timezone is saved on the user for other sessions.
+    """
+
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        tzname = request.session.get('user_timezone', None)
         try:
-            if tzname is None:
-                ip = get_client_ip(request)
-                if ip:
-                    tzname = get_tzname_by_ip(ip)
-                    request.session['user_timezone'] = tzname
+            tzname = self.get_tzname(request)
             if tzname:
-                timezone.activate(pytz_tz.timezone(tzname))
+                timezone.activate(get_timezone(tzname))
             else:
                 timezone.deactivate()
         except:
-            pass
-        return self.get_response(request)
\ No newline at end of file
+            timezone.deactivate()
+        return self.get_response(request)
+
+    def get_tzname(self, request):
+        user = request.user
+        if user.is_authenticated and user.timezone:
+            return user.timezone
+
+        tzname = request.session.get('user_timezone', None)
+        if tzname is None:
+            ip = get_client_ip(request)
+            if ip:
+                tzname = detect_tzname(ip)
+                if tzname is not None:
+                    request.session['user_timezone'] = tzname
+
+        if tzname not in pytz.all_timezones_set:
+            # Never activate or save a name the timezone field would reject
+            return None
+
+        if user.is_authenticated:
+            type(user).objects.filter(pk=user.pk, timezone='').update(
+                timezone=tzname
+            )
+            user.timezone = tzname
+        return tzname
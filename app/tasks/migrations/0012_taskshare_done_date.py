@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 01:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0011_remove_tasknotification_comment_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskshare',
+            name='done_date',
+            field=models.DateTimeField(default=None, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 01:54
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def populate_status(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    Task.objects.filter(done=True).update(status='done')
+    Task.objects.filter(done=False, expire_date__lt=timezone.now()).update(
+        status='failed'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0012_taskshare_done_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='status',
+            field=models.CharField(choices=[('active', 'Active'), ('done', 'Done'), ('failed', 'Failed')], default='active', max_length=6),
+        ),
+        migrations.RunPython(populate_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 01:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0013_task_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['author', 'status', 'create_date'], name='task_author_create_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['author', 'status', 'done_date'], name='task_author_done_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'done'), _negated=True), fields=['author', 'expire_date'], name='task_author_expire_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'expire_date'], name='task_status_expire_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskshare',
+            index=models.Index(condition=models.Q(('done', False)), fields=['to_user', 'task'], name='taskshare_to_user_idx'),
+        ),
+    ]
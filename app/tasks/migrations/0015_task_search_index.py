@@ -0,0 +1,96 @@
+from django.db import migrations
+
+
+# A copy of SQLiteSearchBackend.install() as of this migration, so that
+# later changes to the backend don't change what the migration does
+FTS = 'tasks_task_fts'
+
+OWNERS = (
+    "'u' || {task}.author_id || coalesce((SELECT ' ' || "
+    "group_concat('u' || to_user_id, ' ') FROM tasks_taskshare "
+    "WHERE task_id = {task}.id), '')"
+)
+
+TRIGGERS = (
+    'task_insert', 'task_update', 'task_delete',
+    'share_insert', 'share_update', 'share_delete',
+)
+
+INSTALL = [
+    f"CREATE VIRTUAL TABLE {FTS} USING fts5("
+    f"title, comment, owners, prefix='3')",
+    f'''CREATE TRIGGER {FTS}_task_insert AFTER INSERT ON tasks_task
+    BEGIN
+        INSERT INTO {FTS} (rowid, title, comment, owners)
+        VALUES (new.id, new.title, new.comment,
+                {OWNERS.format(task='new')});
+    END''',
+    f'''CREATE TRIGGER {FTS}_task_update
+    AFTER UPDATE OF title, comment, author_id ON tasks_task
+    BEGIN
+        UPDATE {FTS}
+        SET title = new.title, comment = new.comment,
+            owners = {OWNERS.format(task='new')}
+        WHERE rowid = new.id;
+    END''',
+    f'''CREATE TRIGGER {FTS}_task_delete AFTER DELETE ON tasks_task
+    BEGIN
+        DELETE FROM {FTS} WHERE rowid = old.id;
+    END''',
+    f'''CREATE TRIGGER {FTS}_share_insert
+    AFTER INSERT ON tasks_taskshare
+    BEGIN
+        UPDATE {FTS}
+        SET owners = (SELECT {OWNERS.format(task='tasks_task')}
+                      FROM tasks_task WHERE id = new.task_id)
+        WHERE rowid = new.task_id;
+    END''',
+    f'''CREATE TRIGGER {FTS}_share_update
+    AFTER UPDATE OF task_id, to_user_id ON tasks_taskshare
+    BEGIN
+        UPDATE {FTS}
+        SET owners = (SELECT {OWNERS.format(task='tasks_task')}
+                      FROM tasks_task WHERE id = {FTS}.rowid)
+        WHERE rowid IN (old.task_id, new.task_id);
+    END''',
+    f'''CREATE TRIGGER {FTS}_share_delete
+    AFTER DELETE ON tasks_taskshare
+    BEGIN
+        UPDATE {FTS}
+        SET owners = (SELECT {OWNERS.format(task='tasks_task')}
+                      FROM tasks_task WHERE id = old.task_id)
+        WHERE rowid = old.task_id;
+    END''',
+    f'''INSERT INTO {FTS} (rowid, title, comment, owners)
+    SELECT id, title, comment, {OWNERS.format(task='tasks_task')}
+    FROM tasks_task''',
+]
+
+UNINSTALL = [
+    f'DROP TRIGGER IF EXISTS {FTS}_{trigger}' for trigger in TRIGGERS
+] + [f'DROP TABLE IF EXISTS {FTS}']
+
+
+def install_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in UNINSTALL + INSTALL:
+        schema_editor.execute(statement)
+
+
+def uninstall_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in UNINSTALL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0014_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
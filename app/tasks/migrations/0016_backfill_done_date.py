@@ -0,0 +1,22 @@
+from django.db import migrations
+from django.db.models import F
+
+
+def backfill_done_date(apps, schema_editor):
+    # Tasks done before done_date was added have none, while the done tab
+    # pages on it. Their creation is the closest known date.
+    Task = apps.get_model('tasks', 'Task')
+    Task.objects.filter(done=True, done_date__isnull=True).update(
+        done_date=F('create_date')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0015_task_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_done_date, migrations.RunPython.noop),
+    ]
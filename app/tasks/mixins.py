@@ -1,42 +1,63 @@
-from re import A
 from django.contrib.auth.mixins import UserPassesTestMixin
-from django.core.exceptions import ImproperlyConfigured
 
 
-class UserIsTaskAuthorTestMixin(UserPassesTestMixin):
+class CachedObjectMixin:
+    """Fetches the object of a single object view once per request.
+
+    Permission tests and the view itself share the same instance.
+    """
+
+    def get_object(self, queryset=None):
+        if queryset is not None:
+            return super().get_object(queryset)
+        if not hasattr(self, '_object'):
+            self._object = super().get_object()
+        return self._object
+
+
+class UserIsTaskAuthorTestMixin(CachedObjectMixin, UserPassesTestMixin):
     def test_func(self):
         task = self.get_object()
-        return task.author == self.request.user
+        return task.author_id == self.request.user.id
 
 
-class UserIsTaskShareToUserTestMixin(UserPassesTestMixin):
+class UserIsTaskShareToUserTestMixin(CachedObjectMixin, UserPassesTestMixin):
     def test_func(self):
         task_share = self.get_object()
-        return task_share.to_user == self.request.user
+        return task_share.to_user_id == self.request.user.id
 
 
-class UserIsInTaskSharesUsersTestMixin(UserPassesTestMixin):
+class UserIsInTaskSharesUsersTestMixin(
+    CachedObjectMixin, UserPassesTestMixin
+):
     def test_func(self):
         task = self.get_object()
-        return (
-            self.request.user.id
-            in task.shares.all().values_list('to_user', flat=True)
-        )
+        # Looked up by the unique_task_share index
+        return task.shares.filter(to_user=self.request.user).exists()
 
 
-def UserPassesAnyTestMixin(*test_mixins):
+def _check_test_mixins(test_mixins):
     test_funcs = []
     for test_mixin in test_mixins:
         if not issubclass(test_mixin, UserPassesTestMixin):
             raise TypeError("You should only pass subclasses of UserPassesTestMixin")
         test_funcs.append(getattr(test_mixin, 'test_func'))
-        
+    return test_funcs
+
+
+def UserPassesAnyTestMixin(*test_mixins):
+    """Passes when any of the tests passes, the remaining ones are not run.
+
+    Put the cheapest tests first.
+    """
+    test_funcs = _check_test_mixins(test_mixins)
+
     def test_func(self):
-        return any([test_func(self) for test_func in self.test_funcs])
-            
+        return any(test_func(self) for test_func in self.test_funcs)
+
     return type(
         '_UserPassesAnyTestMixin',
-        (UserPassesTestMixin,),
+        (CachedObjectMixin, UserPassesTestMixin),
         {
             'test_funcs': test_funcs,
             'test_func': test_func
@@ -45,18 +66,15 @@ def UserPassesAnyTestMixin(*test_mixins):
 
 
 def UserPassesAllTestsMixin(*test_mixins):
-    test_funcs = []
-    for test_mixin in test_mixins:
-        if not issubclass(test_mixin, UserPassesTestMixin):
-            raise TypeError("You should only pass subclasses of UserPassesTestMixin")
-        test_funcs.append(getattr(test_mixin, 'test_func'))
-        
+    """Passes when all the tests pass, stops at the first failed one."""
+    test_funcs = _check_test_mixins(test_mixins)
+
     def test_func(self):
-        return all([test_func(self) for test_func in self.test_funcs])
-            
+        return all(test_func(self) for test_func in self.test_funcs)
+
     return type(
         '_UserPassesAllTestsMixin',
-        (UserPassesTestMixin,),
+        (CachedObjectMixin, UserPassesTestMixin),
         {
             'test_funcs': test_funcs,
             'test_func': test_func
@@ -1,12 +1,81 @@
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Q, Value, When
 from django.utils import timezone
 
 from notifications.models import BaseNotification
 
 
+class TaskQuerySet(models.QuerySet):
+    """Status partitioning evaluated by the database.
+
+    Every method takes an optional ``now`` so that several buckets can be
+    fetched against the same point in time.
+    """
+
+    @staticmethod
+    def _active_q(now, prefix=''):
+        return (
+            Q(**{f'{prefix}status': Task.Status.ACTIVE}) &
+            (
+                Q(**{f'{prefix}expire_date__isnull': True}) |
+                Q(**{f'{prefix}expire_date__gte': now})
+            )
+        )
+
+    @staticmethod
+    def _failed_q(now):
+        # Expired tasks are failed even before the sweeper has marked them
+        return ~Q(status=Task.Status.DONE) & Q(expire_date__lt=now)
+
+    def active(self, now=None):
+        return self.filter(self._active_q(now or timezone.now()))
+
+    def done(self):
+        return self.filter(status=Task.Status.DONE)
+
+    def failed(self, now=None):
+        return self.filter(self._failed_q(now or timezone.now()))
+
+    @staticmethod
+    def tab_ordering(status):
+        """Return the ordering of the tab of a status, unique for paging."""
+        return {
+            Task.Status.ACTIVE: ('-create_date', '-id'),
+            Task.Status.DONE: ('-done_date', '-id'),
+            Task.Status.FAILED: ('-expire_date', '-id'),
+        }[status]
+
+    def tab(self, status, now=None):
+        """Tasks shown in the tab of a status, in the order of the tab."""
+        if status == Task.Status.ACTIVE:
+            tasks = self.active(now)
+        elif status == Task.Status.DONE:
+            tasks = self.done()
+        else:
+            tasks = self.failed(now)
+        return tasks.order_by(*self.tab_ordering(status))
+
+    def with_status(self, now=None):
+        now = now or timezone.now()
+        return self.annotate(
+            current_status=Case(
+                When(status=Task.Status.DONE, then=Value(Task.Status.DONE)),
+                When(self._failed_q(now), then=Value(Task.Status.FAILED)),
+                default=Value(Task.Status.ACTIVE),
+                output_field=models.CharField(max_length=6),
+            )
+        )
+
+
 class Task(models.Model):
+
+    class Status(models.TextChoices):
+        ACTIVE = 'active'
+        DONE = 'done'
+        FAILED = 'failed'
+
     title = models.CharField(max_length=50)
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -17,6 +86,34 @@ class Task(models.Model):
     expire_date = models.DateTimeField(blank=True, null=True)
     done = models.BooleanField(default=False)
     done_date = models.DateTimeField(default=None, null=True)
+    status = models.CharField(
+        max_length=6, choices=Status.choices, default=Status.ACTIVE
+    )
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Ascending, so that a backward scan gives the (-date, -id)
+            # order of the tabs with the implicit trailing id column
+            models.Index(
+                fields=['author', 'status', 'create_date'],
+                name='task_author_create_date_idx'
+            ),
+            models.Index(
+                fields=['author', 'status', 'done_date'],
+                name='task_author_done_date_idx'
+            ),
+            models.Index(
+                fields=['author', 'expire_date'],
+                condition=~Q(status='done'),
+                name='task_author_expire_date_idx'
+            ),
+            models.Index(
+                fields=['status', 'expire_date'],
+                name='task_status_expire_date_idx'
+            ),
+        ]
 
     @property
     def active(self):
@@ -27,24 +124,31 @@ class Task(models.Model):
     
     def complete(self):
         now = timezone.now()
-
-        for share in self.shares.all():
-            share.done = True
-            share.done_date = now
-
         self.done = True
         self.done_date = now
 
+        with transaction.atomic():
+            self.save()
+            self.shares.filter(done=False).update(done=True, done_date=now)
+
     @property
     def failed(self):
         return not (self.done or self.active)
 
+    def compute_status(self, now=None):
+        if self.done:
+            return self.Status.DONE
+        if self.expire_date is not None and \
+                self.expire_date < (now or timezone.now()):
+            return self.Status.FAILED
+        return self.Status.ACTIVE
+
     def __str__(self):
         return self.title
 
-    def clean(self):
+    def clean(self, now=None):
         create_date = (self.create_date if self.create_date is not None 
-                                        else timezone.now())
+                                        else now or timezone.now())
         if self.expire_date and self.expire_date <= create_date:
             raise ValidationError(
                 'Task expiration date cannot be from the past'
@@ -56,10 +160,36 @@ class Task(models.Model):
             )
 
     def save(self, *args, **kwargs):
+        # Done tasks are paginated by done date, so it must be filled
+        if self.done and self.done_date is None:
+            self.done_date = timezone.now()
         self.clean()
+        self.status = self.compute_status()
         super().save(*args, **kwargs)
 
 
+class TaskShareQuerySet(models.QuerySet):
+    # A task is shared with a user at most once
+    inbox_ordering = ('-task_id',)
+
+    def inbox(self, user, now=None):
+        """Active shares received by user, with what a shared task card shows.
+
+        The task and the sender are joined in the same query, so iterating
+        over the shares doesn't hit the database again.
+        """
+        active_task = TaskQuerySet._active_q(now or timezone.now(), 'task__')
+        return (
+            self.filter(active_task, to_user=user, done=False)
+            .order_by(*self.inbox_ordering)
+            .select_related('task', 'from_user')
+            .only(
+                'comment', 'task__title', 'task__expire_date',
+                'from_user__username'
+            )
+        )
+
+
 class TaskShare(models.Model):
     task = models.ForeignKey(
         Task,
@@ -78,6 +208,9 @@ class TaskShare(models.Model):
     )
     comment = models.CharField(max_length=255, blank=True)
     done = models.BooleanField(default=False)
+    done_date = models.DateTimeField(default=None, null=True)
+
+    objects = TaskShareQuerySet.as_manager()
 
     class Meta:
         constraints = [
@@ -86,6 +219,13 @@ class TaskShare(models.Model):
                 name='unique_task_share'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['to_user', 'task'],
+                condition=Q(done=False),
+                name='taskshare_to_user_idx'
+            )
+        ]
 
     @property
     def active(self):
@@ -94,10 +234,15 @@ class TaskShare(models.Model):
     def __str__(self):
         return f'{self.from_user} shares {self.task} with {self.to_user}'
 
+    def complete(self):
+        self.done = True
+        self.done_date = timezone.now()
+        self.save()
+
     def clean(self):
-        if self.from_user == self.to_user:
+        if self.from_user_id == self.to_user_id:
             raise ValidationError("You can't share tasks with yourself")
-        elif self.to_user == self.task.author:
+        elif self.to_user_id == self.task.author_id:
             raise ValidationError("You can't share a task with it's author")
 
     def save(self, *args, **kwargs):
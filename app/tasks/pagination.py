@@ -0,0 +1,109 @@
+import base64
+import datetime
+import json
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+class KeysetPaginator:
+    """Cursor pagination over a unique ordering, e.g. ('-done_date', '-id').
+
+    The cursor stores the ordering values of the last row of a page and the
+    next page is fetched with a range condition on them, so every page costs
+    the same as the first one regardless of its depth. Ordering fields must
+    not be null for the paginated rows.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = ordering
+        self.per_page = per_page
+        self.fields = [
+            (name.lstrip('-'), name.startswith('-')) for name in ordering
+        ]
+
+    def get_page(self, cursor=None):
+        queryset = self.queryset.order_by(*self.ordering)
+        if cursor:
+            queryset = queryset.filter(self._after(self.decode(cursor)))
+
+        object_list = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(object_list) > self.per_page:
+            object_list = object_list[:self.per_page]
+            next_cursor = self.encode(object_list[-1])
+        return KeysetPage(object_list, next_cursor)
+
+    def encode(self, obj):
+        values = [self._get_value(obj, name) for name, _ in self.fields]
+        data = json.dumps(values, default=self._serialize)
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            # Null values can't be compared to, see the docstring
+            if len(values) != len(self.fields) or None in values:
+                raise ValueError
+            return [
+                self._get_field(name).to_python(value)
+                for (name, _), value in zip(self.fields, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+
+    def _after(self, values):
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+        conditions = []
+        for i, (name, descending) in enumerate(self.fields):
+            lookup = f"{name}__{'lt' if descending else 'gt'}"
+            equal = {
+                prev_name: prev_value
+                for (prev_name, _), prev_value
+                in zip(self.fields[:i], values[:i])
+            }
+            conditions.append(Q(**equal, **{lookup: values[i]}))
+        return reduce(lambda a, b: a | b, conditions)
+
+    def _get_field(self, name):
+        model = self.queryset.model
+        *relations, field_name = name.split('__')
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.get_field(field_name)
+
+    @staticmethod
+    def _serialize(value):
+        # Unlike DjangoJSONEncoder, keep microseconds: the cursor has to
+        # match the stored value exactly.
+        if isinstance(value, datetime.datetime):
+            return value.isoformat()
+        raise TypeError(f"{type(value).__name__} is not cursor serializable")
+
+    @staticmethod
+    def _get_value(obj, name):
+        for attr in name.split('__'):
+            obj = getattr(obj, attr)
+        return obj
@@ -0,0 +1,239 @@
+import re
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+
+MAX_TERMS = 10
+
+
+def get_terms(query):
+    """Split a user query into lowercase word terms."""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+class SearchPage:
+    def __init__(self, object_list, number, has_next):
+        self.object_list = object_list
+        self.number = number
+        self.has_next = has_next
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_previous(self):
+        return self.number > 1
+
+    @property
+    def next_page_number(self):
+        return self.number + 1
+
+    @property
+    def previous_page_number(self):
+        return self.number - 1
+
+
+class BaseSearchBackend:
+    """Finds the tasks a user authored or received via TaskShare.
+
+    Backends return ids of matching tasks ordered by relevance.
+    """
+
+    def search(self, user, terms, offset, limit):
+        raise NotImplementedError
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """Fallback for databases without a configured full-text index.
+
+    Every term must occur in the title or the comment. Results are
+    ordered by creation date, there is no relevance ranking.
+    """
+
+    def search(self, user, terms, offset, limit):
+        tasks = Task.objects.filter(Q(author=user) | Q(shares__to_user=user))
+        for term in terms:
+            tasks = tasks.filter(
+                Q(title__icontains=term) | Q(comment__icontains=term)
+            )
+        tasks = tasks.distinct().order_by('-create_date', '-id')
+        return list(tasks.values_list('id', flat=True)[offset:offset + limit])
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """Ranked search over an FTS5 index maintained by triggers.
+
+    Besides the title and the comment, each row of the index holds an
+    ``owners`` column with a ``u<id>`` token for the author and every share
+    recipient, so the user restriction is resolved inside the index
+    together with the terms and only the user's matches get ranked.
+    """
+    table = 'tasks_task_fts'
+    # bm25() weights of the title, comment and owners columns
+    weights = (10.0, 1.0, 0.0)
+    # Shorter prefixes expand to too many words to stay fast
+    min_prefix_length = 3
+    triggers = (
+        'task_insert', 'task_update', 'task_delete',
+        'share_insert', 'share_update', 'share_delete',
+    )
+
+    def search(self, user, terms, offset, limit):
+        phrases = [f'"{term}"' for term in terms]
+        if len(terms[-1]) >= self.min_prefix_length:
+            # Match the word that is still being typed by its prefix
+            phrases[-1] += '*'
+        phrases = ' AND '.join(phrases)
+        match = f'{{title comment}}: ({phrases}) AND owners: u{user.pk}'
+        weights = ', '.join(map(str, self.weights))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} '
+                f'WHERE {self.table} MATCH %s '
+                f'ORDER BY bm25({self.table}, {weights}), rowid DESC '
+                f'LIMIT %s OFFSET %s',
+                [match, limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    @classmethod
+    def install(cls, cursor):
+        """Create the index and its triggers, then fill the index.
+
+        SQLite drops triggers together with their table, so this runs
+        again after migrations that remake the tasks_task or
+        tasks_taskshare table, see install_search_index().
+        """
+        cls.uninstall(cursor)
+        owners = (
+            "'u' || {task}.author_id || coalesce((SELECT ' ' || "
+            "group_concat('u' || to_user_id, ' ') FROM tasks_taskshare "
+            "WHERE task_id = {task}.id), '')"
+        )
+        fts = cls.table
+        statements = [
+            f'CREATE VIRTUAL TABLE {fts} USING fts5('
+            f"title, comment, owners, prefix='{cls.min_prefix_length}')",
+            f'''CREATE TRIGGER {fts}_task_insert AFTER INSERT ON tasks_task
+            BEGIN
+                INSERT INTO {fts} (rowid, title, comment, owners)
+                VALUES (new.id, new.title, new.comment,
+                        {owners.format(task='new')});
+            END''',
+            f'''CREATE TRIGGER {fts}_task_update
+            AFTER UPDATE OF title, comment, author_id ON tasks_task
+            BEGIN
+                UPDATE {fts}
+                SET title = new.title, comment = new.comment,
+                    owners = {owners.format(task='new')}
+                WHERE rowid = new.id;
+            END''',
+            f'''CREATE TRIGGER {fts}_task_delete AFTER DELETE ON tasks_task
+            BEGIN
+                DELETE FROM {fts} WHERE rowid = old.id;
+            END''',
+            f'''CREATE TRIGGER {fts}_share_insert
+            AFTER INSERT ON tasks_taskshare
+            BEGIN
+                UPDATE {fts}
+                SET owners = (SELECT {owners.format(task='tasks_task')}
+                              FROM tasks_task WHERE id = new.task_id)
+                WHERE rowid = new.task_id;
+            END''',
+            f'''CREATE TRIGGER {fts}_share_update
+            AFTER UPDATE OF task_id, to_user_id ON tasks_taskshare
+            BEGIN
+                UPDATE {fts}
+                SET owners = (SELECT {owners.format(task='tasks_task')}
+                              FROM tasks_task WHERE id = {fts}.rowid)
+                WHERE rowid IN (old.task_id, new.task_id);
+            END''',
+            f'''CREATE TRIGGER {fts}_share_delete
+            AFTER DELETE ON tasks_taskshare
+            BEGIN
+                UPDATE {fts}
+                SET owners = (SELECT {owners.format(task='tasks_task')}
+                              FROM tasks_task WHERE id = old.task_id)
+                WHERE rowid = old.task_id;
+            END''',
+            f'''INSERT INTO {fts} (rowid, title, comment, owners)
+            SELECT id, title, comment, {owners.format(task='tasks_task')}
+            FROM tasks_task''',
+        ]
+        for statement in statements:
+            cursor.execute(statement)
+
+    @classmethod
+    def uninstall(cls, cursor):
+        for trigger in cls.triggers:
+            cursor.execute(
+                f'DROP TRIGGER IF EXISTS {cls.table}_{trigger}'
+            )
+        cursor.execute(f'DROP TABLE IF EXISTS {cls.table}')
+
+    @classmethod
+    def is_installed(cls, cursor):
+        """Whether the index and all of its triggers exist."""
+        names = [cls.table] + [
+            f'{cls.table}_{trigger}' for trigger in cls.triggers
+        ]
+        cursor.execute(
+            'SELECT count(*) FROM sqlite_master WHERE name IN (%s)'
+            % ', '.join(['%s'] * len(names)),
+            names
+        )
+        return cursor.fetchone()[0] == len(names)
+
+
+def install_search_index(using, verbosity=1, **kwargs):
+    """Rebuild the SQLite index when it or one of its triggers is missing.
+
+    Connected to post_migrate, as migrations remaking the tasks_task or
+    tasks_taskshare table drop their triggers and leave the index stale.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    applied = MigrationRecorder(connection).applied_migrations()
+    if ('tasks', '0015_task_search_index') not in applied:
+        return
+    with transaction.atomic(using), connection.cursor() as cursor:
+        if SQLiteSearchBackend.is_installed(cursor):
+            return
+        if verbosity >= 2:
+            print("Rebuilding the task search index")
+        SQLiteSearchBackend.install(cursor)
+
+
+def get_search_backend():
+    path = getattr(settings, 'TASKS_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == 'sqlite':
+        return SQLiteSearchBackend()
+    return DatabaseSearchBackend()
+
+
+def search_tasks(user, query, page=1, per_page=24):
+    """Return a page of the user's own and shared tasks matching query."""
+    terms = get_terms(query)
+    if not terms:
+        return SearchPage([], page, False)
+
+    offset = (page - 1) * per_page
+    ids = get_search_backend().search(user, terms, offset, per_page + 1)
+    has_next = len(ids) > per_page
+    ids = ids[:per_page]
+    tasks = Task.objects.select_related('author').in_bulk(ids)
+    return SearchPage(
+        [tasks[pk] for pk in ids if pk in tasks], page, has_next
+    )
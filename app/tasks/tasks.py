@@ -0,0 +1,50 @@
+import pytz
+import requests
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Task
+from .utils import TZNAME_UNKNOWN, get_tzname_cache_key, resolve_tzname
+
+
+@shared_task
+def fail_expired_tasks(batch_size=1000):
+    """Mark active tasks whose expiration date has passed as failed."""
+    now = timezone.now()
+    expired = Task.objects.filter(
+        status=Task.Status.ACTIVE, expire_date__lt=now
+    )
+    failed = 0
+    while True:
+        ids = list(expired.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        failed += expired.filter(pk__in=ids).update(
+            status=Task.Status.FAILED
+        )
+    return failed
+
+
+@shared_task(ignore_result=True)
+def resolve_ip_timezone(ip):
+    """Resolve the timezone of ip and cache it for detect_tzname().
+
+    Failed lookups are cached too, for a shorter time, so that requests
+    from the address don't schedule a new lookup each.
+    """
+    try:
+        tzname = resolve_tzname(ip)
+    except (requests.RequestException, ValueError, KeyError):
+        tzname = None
+    if tzname in pytz.all_timezones_set:
+        cache.set(
+            get_tzname_cache_key(ip), tzname, settings.IPTZ_CACHE_TIMEOUT
+        )
+    else:
+        cache.set(
+            get_tzname_cache_key(ip), TZNAME_UNKNOWN,
+            settings.IPTZ_FAILURE_CACHE_TIMEOUT
+        )
+    return tzname
@@ -1,23 +1,58 @@
+import csv
+import gzip
+import io
+import importlib
+import json
+import os
+import tempfile
 from datetime import timedelta
 from itertools import product
 from time import sleep
+from unittest import mock
 
+import requests
+from django.apps import apps
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
 from django.forms.models import model_to_dict
 from django.test import (
     SimpleTestCase,
     RequestFactory,
     TestCase,
-    TransactionTestCase
+    TransactionTestCase,
+    override_settings
 )
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from django.urls import reverse
 
 from friendships.models import Friend
+from . import bulk, imports
+from .hot_queries import HOT_QUERIES
 from .models import Task, TaskShare
-from .utils import get_client_ip, get_tzname_by_ip
+from .pagination import InvalidCursor, KeysetPaginator
+from .search import (
+    SQLiteSearchBackend,
+    install_search_index,
+    search_tasks
+)
+from .tasks import fail_expired_tasks, resolve_ip_timezone
+from . import iptz
+from .iptz import IPTimezoneTable, InvalidTable
+from .middleware import UserTimezoneMiddleware
+from .utils import (
+    detect_tzname,
+    get_client_ip,
+    get_tzname_by_ip,
+    get_timezone,
+    get_tzname_from_table,
+    resolve_tzname
+)
 
 
 user_model = get_user_model()
@@ -74,6 +109,154 @@ class TaskIndexViewTest(TestCase):
         response = self.client.get(reverse('tasks:index'), follow=True)
         self.assertEqual(response.request['PATH_INFO'], reverse('login'))
 
+    def test_done_and_failed_tabs_are_not_rendered(self):
+        task = create_test_task(author=self.user)
+        task.complete()
+        response = self.client.get(reverse('tasks:index'))
+        self.assertNotIn('done_tasks', response.context)
+        self.assertNotIn('failed_tasks', response.context)
+        self.assertNotContains(response, task.title)
+
+    def test_shared_tasks_queries_do_not_grow(self):
+        friend = user_model.objects.create(username='testfriend')
+        task = create_test_task(author=friend)
+        TaskShare.objects.create(task=task, from_user=friend, to_user=self.user)
+        with CaptureQueriesContext(connection) as one_share:
+            self.client.get(reverse('tasks:index'))
+
+        for title in ("First", "Second", "Third"):
+            task = create_test_task(title=title, author=friend)
+            TaskShare.objects.create(
+                task=task, from_user=friend, to_user=self.user
+            )
+        with CaptureQueriesContext(connection) as many_shares:
+            response = self.client.get(reverse('tasks:index'))
+
+        self.assertEqual(len(many_shares), len(one_share))
+        self.assertContains(response, "Shared by @testfriend", count=4)
+
+    def test_only_active_shared_tasks(self):
+        friend = user_model.objects.create(username='testfriend')
+        active, done, failed = (
+            create_test_task(title=title, author=friend)
+            for title in ("Active", "Done", "Failed")
+        )
+        done.complete()
+        Task.objects.filter(pk=failed.pk).update(
+            expire_date=timezone.now() - timedelta(minutes=1)
+        )
+        for task in (active, done, failed):
+            TaskShare.objects.create(
+                task=task, from_user=friend, to_user=self.user
+            )
+        response = self.client.get(reverse('tasks:index'))
+        self.assertEqual(
+            [share.task for share in response.context['active_shared_tasks']],
+            [active]
+        )
+        self.assertEqual(response.context['active_shared_tasks_count'], 1)
+
+
+class TaskSharedPageViewTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='testuser')
+        self.client.force_login(self.user)
+        self.friend = user_model.objects.create(username='testfriend')
+
+    def test_view_uses_correct_template(self):
+        response = self.client.get(reverse('tasks:shared_page'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'tasks/shared_task_page.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+
+    def test_pages_follow_cursor(self):
+        shares = [
+            TaskShare.objects.create(
+                task=create_test_task(author=self.friend),
+                from_user=self.friend,
+                to_user=self.user
+            )
+            for _ in range(30)
+        ]
+        response = self.client.get(reverse('tasks:index'))
+        first_page = response.context['active_shared_tasks']
+        self.assertEqual(response.context['active_shared_tasks_count'], 30)
+        self.assertContains(response, reverse('tasks:shared_page'))
+        response = self.client.get(
+            reverse('tasks:shared_page'), {'cursor': first_page.next_cursor}
+        )
+        second_page = response.context['shared_tasks']
+        self.assertFalse(second_page.has_next)
+        self.assertEqual(list(first_page) + list(second_page), shares[::-1])
+
+    def test_login_required(self):
+        self.client.logout()
+        response = self.client.get(reverse('tasks:shared_page'), follow=True)
+        self.assertEqual(response.request['PATH_INFO'], reverse('login'))
+
+
+class TaskTabViewTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='testuser')
+        self.client.force_login(self.user)
+
+    def test_url_names(self):
+        for name in ('tasks:done_tab', 'tasks:failed_tab'):
+            response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200)
+
+    def test_view_uses_correct_template(self):
+        response = self.client.get(reverse('tasks:failed_tab'))
+        self.assertTemplateUsed(response, 'tasks/failed_task_tab.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+
+    def test_content(self):
+        task = create_test_task(author=self.user)
+        task.complete()
+        response = self.client.get(reverse('tasks:done_tab'))
+        self.assertContains(response, task.title)
+        self.assertContains(response, reverse('tasks:repeat', args=(task.id,)))
+
+
+class TaskPageViewTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='testuser')
+        self.client.force_login(self.user)
+
+    def test_url_names(self):
+        for name in ('tasks:active_page', 'tasks:done_page', 'tasks:failed_page'):
+            response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200)
+
+    def test_view_uses_correct_template(self):
+        response = self.client.get(reverse('tasks:done_page'))
+        self.assertTemplateUsed(response, 'tasks/done_task_page.html')
+
+    def test_pages_follow_cursor(self):
+        tasks = [create_test_task(author=self.user) for _ in range(30)]
+        response = self.client.get(reverse('tasks:active_page'))
+        first_page = response.context['tasks']
+        self.assertTrue(first_page.has_next)
+        response = self.client.get(
+            reverse('tasks:active_page'), {'cursor': first_page.next_cursor}
+        )
+        second_page = response.context['tasks']
+        self.assertFalse(second_page.has_next)
+        self.assertEqual(
+            list(first_page) + list(second_page), tasks[::-1]
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            reverse('tasks:active_page'), {'cursor': 'invalid'}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_login_required(self):
+        self.client.logout()
+        response = self.client.get(reverse('tasks:done_page'), follow=True)
+        self.assertEqual(response.request['PATH_INFO'], reverse('login'))
+
 
 class TaskCreateViewTest(TestCase):
     def setUp(self):
@@ -299,6 +482,36 @@ class TaskDoneViewTest(TestCase):
         task.refresh_from_db()
         self.assertTrue(task.done)
 
+    def test_view_completes_shares(self):
+        task = create_test_task(author=self.user)
+        for user in create_bunch_of_test_users(3):
+            TaskShare.objects.create(
+                task=task, from_user=self.user, to_user=user
+            )
+        self.client.post(reverse('tasks:done', args=(task.id,)))
+        task.refresh_from_db()
+        for share in task.shares.all():
+            self.assertTrue(share.done)
+            self.assertEqual(share.done_date, task.done_date)
+
+    def test_query_count_does_not_depend_on_shares(self):
+        def count_queries(task):
+            with CaptureQueriesContext(connection) as context:
+                self.client.post(reverse('tasks:done', args=(task.id,)))
+            return len(context.captured_queries)
+
+        users = list(create_bunch_of_test_users(5))
+        task1 = create_test_task(author=self.user)
+        TaskShare.objects.create(
+            task=task1, from_user=self.user, to_user=users[0]
+        )
+        task2 = create_test_task(author=self.user)
+        for user in users:
+            TaskShare.objects.create(
+                task=task2, from_user=self.user, to_user=user
+            )
+        self.assertEqual(count_queries(task1), count_queries(task2))
+
     def test_login_required(self):
         self.client.logout()
         task = create_test_task(author=self.user)
@@ -316,6 +529,311 @@ class TaskDoneViewTest(TestCase):
         self.assertEqual(response.status_code, 403)
 
 
+class TaskBulkActionViewTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='testuser')
+        self.client.force_login(self.user)
+        self.url = reverse('tasks:bulk_action')
+        self.tasks = [create_test_task(author=self.user) for _ in range(3)]
+        self.ids = [task.id for task in self.tasks]
+        other_user = get_user_model().objects.create(username='notauthor')
+        self.foreign_task = create_test_task(author=other_user)
+
+    def post(self, action, ids):
+        return self.client.post(self.url, {'action': action, 'ids': ids})
+
+    def test_url(self):
+        response = self.client.post('/tasks/bulk/', {
+            'action': 'complete', 'ids': self.ids
+        })
+        self.assertEqual(response.status_code, 200)
+
+    def test_complete(self):
+        self.tasks[0].complete()
+        response = self.post('complete', self.ids)
+        self.assertEqual(response.json()['results'], {
+            str(self.ids[0]): 'skipped',
+            str(self.ids[1]): 'completed',
+            str(self.ids[2]): 'completed',
+        })
+        self.assertEqual(Task.objects.done().count(), 3)
+
+    def test_delete(self):
+        response = self.post('delete', self.ids[:2])
+        self.assertEqual(response.json()['results'], {
+            str(pk): 'deleted' for pk in self.ids[:2]
+        })
+        self.assertQuerysetEqual(
+            Task.objects.filter(author=self.user), [self.tasks[2]]
+        )
+
+    def test_repeat(self):
+        self.tasks[0].complete()
+        response = self.post('repeat', self.ids[:2])
+        self.assertEqual(response.json()['results'], {
+            str(self.ids[0]): 'repeated',
+            str(self.ids[1]): 'skipped',
+        })
+        new_task = Task.objects.last()
+        self.assertEqual(new_task.title, self.tasks[0].title)
+        self.assertTrue(new_task.active)
+
+    def test_foreign_and_missing_tasks(self):
+        missing_id = self.foreign_task.id + 1
+        response = self.post('delete', [self.foreign_task.id, missing_id])
+        self.assertEqual(response.json()['results'], {
+            str(self.foreign_task.id): 'not_found',
+            str(missing_id): 'not_found',
+        })
+        self.assertTrue(Task.objects.filter(pk=self.foreign_task.id).exists())
+
+    def test_authorizes_with_one_query(self):
+        with CaptureQueriesContext(connection) as context:
+            self.post('complete', self.ids)
+        task_selects = [
+            q for q in context.captured_queries
+            if q['sql'].startswith('SELECT') and 'tasks_task' in q['sql']
+        ]
+        self.assertEqual(len(task_selects), 1)
+
+    def test_invalid_form(self):
+        response = self.post('archive', ['a'])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('action', response.json()['errors'])
+        self.assertIn('ids', response.json()['errors'])
+
+    def test_login_required(self):
+        self.client.logout()
+        response = self.post('delete', self.ids)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Task.objects.filter(author=self.user).count(), 3)
+
+
+class TaskExportViewTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='testuser')
+        self.client.force_login(self.user)
+        self.task = create_test_task(author=self.user, title='Exported')
+        friend = user_model.objects.create(username='testfriend')
+        self.share = TaskShare.objects.create(
+            task=self.task, from_user=self.user, to_user=friend
+        )
+        other_user = get_user_model().objects.create(username='notauthor')
+        create_test_task(author=other_user, title='Not exported')
+
+    def test_url(self):
+        response = self.client.get('/tasks/export/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_csv(self):
+        response = self.client.get(reverse('tasks:export'))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['record'], 'task')
+        self.assertEqual(rows[0]['title'], 'Exported')
+        self.assertEqual(rows[1]['record'], 'share')
+        self.assertEqual(rows[1]['task_id'], str(self.task.id))
+        self.assertEqual(rows[1]['to_user'], 'testfriend')
+
+    def test_ndjson_gzip(self):
+        response = self.client.get(
+            reverse('tasks:export'), {'format': 'ndjson', 'gzip': '1'}
+        )
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        content = gzip.decompress(b''.join(response.streaming_content))
+        records = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(
+            [(r['record'], r['id']) for r in records],
+            [('task', self.task.id), ('share', self.share.id)]
+        )
+
+    def test_unknown_format(self):
+        response = self.client.get(reverse('tasks:export'), {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_login_required(self):
+        self.client.logout()
+        response = self.client.get(reverse('tasks:export'))
+        self.assertEqual(response.status_code, 302)
+
+
+class ExportTasksCommandTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='testuser')
+        other_user = get_user_model().objects.create(username='otheruser')
+        self.tasks = [
+            create_test_task(author=user) for user in (self.user, other_user)
+        ]
+
+    def export(self, *args):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'tasks.ndjson')
+            call_command(
+                'export_tasks', '--format', 'ndjson', '--output', path, *args
+            )
+            with open(path) as f:
+                return [json.loads(line) for line in f]
+
+    def test_export_all(self):
+        records = self.export('--chunk-size', '1')
+        self.assertEqual(
+            [r['id'] for r in records], [t.id for t in self.tasks]
+        )
+
+    def test_export_user(self):
+        records = self.export('--user', 'testuser')
+        self.assertEqual([r['id'] for r in records], [self.tasks[0].id])
+
+    def test_unknown_user(self):
+        with self.assertRaises(CommandError):
+            self.export('--user', 'nobody')
+
+
+class TaskImportViewTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='testuser')
+        self.client.force_login(self.user)
+
+    def test_url(self):
+        response = self.client.get('/tasks/import/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'tasks/import.html')
+
+    def test_import_csv(self):
+        expire_date = (timezone.now() + timedelta(days=1)).isoformat()
+        content = (
+            'title,comment,expire_date,done\n'
+            f'First,Some comment,{expire_date},\n'
+            'Second,,,true\n'
+            ',Missing title,,\n'
+        )
+        upload = SimpleUploadedFile('tasks.csv', content.encode())
+        response = self.client.post(
+            reverse('tasks:import'), {'file': upload, 'format': 'csv'}
+        )
+        self.assertEqual(response.status_code, 200)
+        report = response.context['report']
+        self.assertEqual(report['created'], 2)
+        self.assertEqual([e['row'] for e in report['errors']], [3])
+        self.assertQuerysetEqual(
+            Task.objects.filter(author=self.user).order_by('id')
+            .values_list('title', 'done'),
+            [('First', False), ('Second', True)]
+        )
+
+    def test_login_required(self):
+        self.client.logout()
+        response = self.client.get(reverse('tasks:import'))
+        self.assertEqual(response.status_code, 302)
+
+
+class TaskImportTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='testuser')
+
+    def test_validates_like_clean(self):
+        past_date = timezone.now() - timedelta(minutes=1)
+        report = imports.import_tasks([
+            {'title': 'Valid'},
+            {'title': 'Past', 'expire_date': past_date.isoformat()},
+            {'title': 'Not done', 'done_date': timezone.now().isoformat()},
+            {'title': 'x' * 51},
+            {'title': 'Bad date', 'expire_date': 'tomorrow'},
+            ['not', 'an', 'object'],
+        ], self.user)
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(
+            [e['row'] for e in report['errors']], [2, 3, 4, 5, 6]
+        )
+
+    def test_batches(self):
+        rows = ({'title': f'Task {i}'} for i in range(10))
+        with CaptureQueriesContext(connection) as context:
+            report = imports.import_tasks(rows, self.user, batch_size=4)
+        self.assertEqual(report['created'], 10)
+        inserts = [
+            q for q in context.captured_queries
+            if q['sql'].startswith('INSERT')
+        ]
+        self.assertEqual(len(inserts), 3)
+
+    def test_json_array_and_lines(self):
+        rows = [{'title': f'Task {i}', 'comment': 'x' * 50} for i in range(20)]
+        for content in (json.dumps(rows), '\n'.join(map(json.dumps, rows))):
+            stream = io.BytesIO(content.encode())
+            parsed = list(imports.iter_json_rows(stream, chunk_size=16))
+            self.assertEqual(parsed, rows)
+
+    def test_malformed_json(self):
+        stream = io.BytesIO(b'[{"title": "First"}, {"title": ')
+        report = imports.import_stream(stream, self.user, format='json')
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(report['errors'][0]['row'], 2)
+
+    def test_json_values_split_across_chunks(self):
+        content = b'[12345, {"title": "a \\" ] b"}, "text", true]'
+        for chunk_size in (1, 2, 3, 64):
+            stream = io.BytesIO(content)
+            self.assertEqual(
+                list(imports.iter_json_rows(stream, chunk_size=chunk_size)),
+                [12345, {'title': 'a " ] b'}, 'text', True]
+            )
+
+    def test_malformed_json_row(self):
+        for content in (
+            b'[{"title": "First"}, {"title": }, {"title": "Third"}]',
+            b'{"title": "First"}\n{"title": }\n{"title": "Third"}\n',
+        ):
+            stream = io.BytesIO(content)
+            rows = list(imports.iter_json_rows(stream, chunk_size=2))
+            self.assertEqual(len(rows), 3)
+            self.assertIsInstance(rows[1], imports.TaskImportError)
+
+            report = imports.import_tasks(iter(rows), self.user)
+            self.assertEqual(report['created'], 2)
+            self.assertEqual(
+                [error['row'] for error in report['errors']], [2]
+            )
+
+    def test_json_values_of_wrong_type(self):
+        rows = [
+            {'title': 'x', 'expire_date': 5},
+            {'title': 'x', 'done': True, 'done_date': 7},
+            {'title': ['not', 'text']},
+            {'title': 'x', 'comment': {'not': 'text'}},
+            {'title': 'x', 'done': 1},
+            {'title': 'Valid', 'done': True},
+        ]
+        stream = io.BytesIO(json.dumps(rows).encode())
+        report = imports.import_stream(stream, self.user, format='json')
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(
+            [e['row'] for e in report['errors']], [1, 2, 3, 4, 5]
+        )
+        self.assertEqual(
+            report['errors'][0]['errors'], ['expire_date: Invalid value 5']
+        )
+
+    def test_json_row_too_long(self):
+        stream = io.BytesIO(b'[{"title": "' + b'x' * 100 + b'"}]')
+        with self.assertRaises(imports.TaskImportError):
+            list(imports.iter_json_rows(
+                stream, chunk_size=8, max_row_size=50
+            ))
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'tasks.ndjson')
+            with open(path, 'w') as f:
+                f.write('{"title": "First"}\n{"title": "Second"}\n')
+            call_command('import_tasks', path, '--user', 'testuser',
+                         stdout=io.StringIO())
+        self.assertEqual(Task.objects.filter(author=self.user).count(), 2)
+
+
 class TaskShareCreateViewTest(TransactionTestCase):
     def setUp(self):
         self.user = user_model.objects.create(username='testuser')
@@ -363,6 +881,148 @@ class TaskShareCreateViewTest(TransactionTestCase):
         self.assertEqual(response.request['PATH_INFO'], reverse('login'))
 
 
+class TaskShareBulkCreateViewTest(TestCase):
+    def setUp(self):
+        self.user = user_model.objects.create(username='testuser')
+        self.client.force_login(self.user)
+        self.task = create_test_task(author=self.user)
+        self.friends = [
+            user_model.objects.create(username=f'friend{i}')
+            for i in range(5)
+        ]
+        Friend.objects.bulk_create(
+            [Friend(from_user=friend, to_user=self.user)
+             for friend in self.friends] +
+            [Friend(from_user=self.user, to_user=friend)
+             for friend in self.friends]
+        )
+        self.url = reverse('tasks:share_bulk_create', args=(self.task.id,))
+
+    def post(self, friends, **kwargs):
+        return self.client.post(self.url, {
+            'to_users': [friend.id for friend in friends],
+            'comment': 'testcomment',
+            **kwargs
+        })
+
+    def test_view_uses_correct_template(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'tasks/task_share_bulk_create.html')
+        self.assertContains(response, 'friend4')
+
+    def test_share_with_many_friends(self):
+        TaskShare.objects.create(
+            task=self.task, from_user=self.user, to_user=self.friends[0]
+        )
+        response = self.post(self.friends)
+        self.assertRedirects(response, reverse('tasks:index'))
+        self.assertCountEqual(
+            self.task.shares.values_list('to_user', flat=True),
+            [friend.id for friend in self.friends]
+        )
+        self.assertEqual(
+            self.task.shares.filter(comment='testcomment').count(), 4
+        )
+
+    def test_returns_new_recipients_only(self):
+        TaskShare.objects.create(
+            task=self.task, from_user=self.user, to_user=self.friends[0]
+        )
+        self.assertEqual(
+            bulk.share_task(
+                self.task, self.user,
+                [self.user.id] + [friend.id for friend in self.friends[:2]]
+            ),
+            [self.friends[1].id]
+        )
+
+    def test_queries_do_not_depend_on_recipients(self):
+        other_task = create_test_task(author=self.user)
+        with CaptureQueriesContext(connection) as one_friend:
+            self.post(self.friends[:1])
+        self.url = reverse('tasks:share_bulk_create', args=(other_task.id,))
+        with CaptureQueriesContext(connection) as all_friends:
+            self.post(self.friends)
+        self.assertEqual(len(all_friends), len(one_friend))
+
+    def test_only_friends(self):
+        stranger = user_model.objects.create(username='stranger')
+        response = self.post([self.friends[0], stranger])
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(self.task.shares.exists())
+
+    def test_recipient_does_not_share_with_author(self):
+        recipient = self.friends[0]
+        TaskShare.objects.create(
+            task=self.task, from_user=self.user, to_user=recipient
+        )
+        Friend.objects.bulk_create([
+            Friend(from_user=self.friends[1], to_user=recipient),
+            Friend(from_user=recipient, to_user=self.friends[1]),
+        ])
+        self.client.force_login(recipient)
+        response = self.post([self.user, self.friends[1]])
+        self.assertRedirects(response, reverse('tasks:index'))
+        self.assertCountEqual(
+            self.task.shares.values_list('to_user', flat=True),
+            [recipient.id, self.friends[1].id]
+        )
+
+    def test_forbidden_for_strangers(self):
+        self.client.force_login(self.friends[0])
+        response = self.post(self.friends[1:])
+        self.assertEqual(response.status_code, 403)
+
+
+class TaskPermissionTest(TestCase):
+    def setUp(self):
+        self.author, self.recipient, self.stranger = (
+            create_bunch_of_test_users()
+        )
+        self.task = create_test_task(author=self.author)
+        TaskShare.objects.create(
+            task=self.task, from_user=self.author, to_user=self.recipient
+        )
+
+    def get(self, user, url):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        tables = {
+            table: sum(f'FROM "{table}"' in q['sql'] for q in queries)
+            for table in ('tasks_task', 'tasks_taskshare')
+        }
+        return response, tables
+
+    def test_author_check_reuses_the_object(self):
+        url = reverse('tasks:update', args=(self.task.id,))
+        response, tables = self.get(self.author, url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(tables, {'tasks_task': 1, 'tasks_taskshare': 0})
+
+    def test_any_test_stops_at_passed_one(self):
+        url = reverse('tasks:share_create', args=(self.task.id,))
+        response, tables = self.get(self.author, url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(tables, {'tasks_task': 1, 'tasks_taskshare': 0})
+
+    def test_share_recipient_check_is_one_query(self):
+        url = reverse('tasks:share_create', args=(self.task.id,))
+        response, tables = self.get(self.recipient, url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(tables, {'tasks_task': 1, 'tasks_taskshare': 1})
+
+        response, tables = self.get(self.stranger, url)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(tables, {'tasks_task': 1, 'tasks_taskshare': 1})
+
+    def test_missing_task(self):
+        url = reverse('tasks:share_create', args=(self.task.id + 1,))
+        response, _ = self.get(self.author, url)
+        self.assertEqual(response.status_code, 404)
+
+
 class TaskShareListViewTest(TransactionTestCase):
     def setUp(self):
         self.user = get_user_model().objects.create(username='testuser')
@@ -426,6 +1086,22 @@ class TaskModelTest(TestCase):
         with self.assertRaises(ValidationError):
             create_test_task(author=self.author, expire_date=past_date)
 
+    def test_complete(self):
+        task = create_test_task(author=self.author)
+        others = list(create_bunch_of_test_users(2))
+        for user in others:
+            TaskShare.objects.create(
+                task=task, from_user=self.author, to_user=user
+            )
+        with self.assertNumQueries(4):
+            task.complete()
+        task.refresh_from_db()
+        self.assertTrue(task.done)
+        self.assertIsNotNone(task.done_date)
+        self.assertEqual(
+            task.shares.filter(done=True, done_date=task.done_date).count(), 2
+        )
+
     def test_failed_property(self):
         expire_date = timezone.now() + timedelta(seconds=1)
         task = create_test_task(author=self.author, expire_date=expire_date)
@@ -445,6 +1121,263 @@ class TaskModelTest(TestCase):
             self.assertEqual(task.active, answer)
 
 
+class TaskQuerySetTest(TestCase):
+    def setUp(self):
+        self.author = get_user_model().objects.create(username='testuser')
+        self.active_task = create_test_task(author=self.author)
+        self.no_expire_task = create_test_task(
+            author=self.author, expire_date=None
+        )
+        self.done_task = create_test_task(author=self.author)
+        self.done_task.complete()
+        self.failed_task = create_test_task(author=self.author)
+        Task.objects.filter(pk=self.failed_task.pk).update(
+            expire_date=timezone.now() - timedelta(minutes=1)
+        )
+
+    def test_active(self):
+        self.assertQuerysetEqual(
+            Task.objects.active(),
+            [self.active_task, self.no_expire_task],
+            ordered=False
+        )
+
+    def test_done(self):
+        self.assertQuerysetEqual(Task.objects.done(), [self.done_task])
+
+    def test_failed(self):
+        self.assertQuerysetEqual(Task.objects.failed(), [self.failed_task])
+
+    def test_failed_uses_given_now(self):
+        now = timezone.now() + timedelta(hours=1)
+        self.assertQuerysetEqual(
+            Task.objects.failed(now),
+            [self.active_task, self.failed_task],
+            ordered=False
+        )
+
+    def test_status_is_persisted(self):
+        statuses = dict(Task.objects.values_list('id', 'status'))
+        self.assertEqual(statuses[self.active_task.id], Task.Status.ACTIVE)
+        self.assertEqual(statuses[self.done_task.id], Task.Status.DONE)
+        # Not swept yet, but already reported as failed
+        self.assertEqual(statuses[self.failed_task.id], Task.Status.ACTIVE)
+
+    def test_fail_expired_tasks(self):
+        self.assertEqual(fail_expired_tasks(batch_size=1), 1)
+        self.failed_task.refresh_from_db()
+        self.assertEqual(self.failed_task.status, Task.Status.FAILED)
+        self.assertQuerysetEqual(Task.objects.failed(), [self.failed_task])
+        self.assertEqual(fail_expired_tasks(), 0)
+
+    def test_with_status(self):
+        statuses = dict(
+            Task.objects.with_status().values_list('id', 'current_status')
+        )
+        self.assertEqual(statuses, {
+            self.active_task.id: Task.Status.ACTIVE,
+            self.no_expire_task.id: Task.Status.ACTIVE,
+            self.done_task.id: Task.Status.DONE,
+            self.failed_task.id: Task.Status.FAILED,
+        })
+
+    def test_status_matches_properties(self):
+        for task in Task.objects.with_status():
+            self.assertEqual(
+                task.current_status == Task.Status.ACTIVE, task.active
+            )
+            self.assertEqual(
+                task.current_status == Task.Status.FAILED, task.failed
+            )
+
+
+class KeysetPaginatorTest(TestCase):
+    def setUp(self):
+        self.author = get_user_model().objects.create(username='testuser')
+        self.tasks = []
+        for _ in range(5):
+            task = create_test_task(author=self.author)
+            task.complete()
+            self.tasks.append(task)
+        # Ties on done date are resolved by id
+        Task.objects.filter(pk__in=[t.pk for t in self.tasks[:3]]).update(
+            done_date=self.tasks[0].done_date
+        )
+
+    def test_pages(self):
+        paginator = KeysetPaginator(
+            Task.objects.done(), ('-done_date', '-id'), per_page=2
+        )
+        seen = []
+        cursor = None
+        while True:
+            page = paginator.get_page(cursor)
+            seen.extend(page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(
+            seen, list(Task.objects.done().order_by('-done_date', '-id'))
+        )
+
+    def test_legacy_done_tasks_without_done_date(self):
+        Task.objects.filter(pk=self.tasks[3].pk).update(done_date=None)
+        migration = importlib.import_module(
+            'tasks.migrations.0016_backfill_done_date'
+        )
+        migration.backfill_done_date(apps, None)
+        self.tasks[3].refresh_from_db()
+        self.assertEqual(self.tasks[3].done_date, self.tasks[3].create_date)
+
+        paginator = KeysetPaginator(
+            Task.objects.done(), ('-done_date', '-id'), per_page=2
+        )
+        cursor = paginator.get_page().next_cursor
+        self.assertEqual(len(paginator.get_page(cursor)), 2)
+
+    def test_invalid_cursor(self):
+        paginator = KeysetPaginator(Task.objects.all(), ('-id',), per_page=2)
+        # The last one holds a null
+        for cursor in ('invalid', 'W10=', 'WzEsIDJd', 'W251bGxd'):
+            with self.assertRaises(InvalidCursor):
+                paginator.get_page(cursor)
+
+
+class TaskSearchTest(TestCase):
+    def setUp(self):
+        self.user, self.friend, self.stranger = create_bunch_of_test_users()
+        self.own = create_test_task(
+            title="Buy milk", author=self.user, comment="At the corner shop"
+        )
+        self.commented = create_test_task(
+            title="Groceries", author=self.user, comment="Milk and bread"
+        )
+        self.shared = create_test_task(
+            title="Milk the cow", author=self.friend, comment=""
+        )
+        self.foreign = create_test_task(
+            title="Milkshake", author=self.stranger, comment=""
+        )
+        TaskShare.objects.create(
+            task=self.shared, from_user=self.friend, to_user=self.user
+        )
+
+    def search(self, query, **kwargs):
+        return list(search_tasks(self.user, query, **kwargs))
+
+    def test_own_and_shared_tasks_are_found(self):
+        found = self.search('milk')
+        self.assertCountEqual(found, [self.own, self.commented, self.shared])
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search('milk')[-1], self.commented)
+
+    def test_prefix_and_all_terms(self):
+        self.assertEqual(self.search('bre'), [self.commented])
+        self.assertEqual(self.search('br'), [])
+        self.assertEqual(self.search('corner mil'), [self.own])
+        self.assertEqual(self.search('mil corner'), [])
+        self.assertEqual(self.search('"milk" OR *'), self.search('milk or'))
+        self.assertEqual(self.search('  '), [])
+
+    def test_index_follows_changes(self):
+        self.own.title = "Sell cheese"
+        self.own.comment = ""
+        self.own.save()
+        self.foreign.delete()
+        TaskShare.objects.create(
+            task=create_test_task(title="Cheese", author=self.stranger),
+            from_user=self.stranger,
+            to_user=self.user
+        )
+        TaskShare.objects.filter(task=self.shared).delete()
+
+        self.assertEqual(len(self.search('cheese')), 2)
+        self.assertCountEqual(self.search('milk'), [self.commented])
+
+    def test_rebuild_search_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('The index is maintained on SQLite only')
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        self.assertEqual(len(self.search('milk')), 3)
+
+    def test_migrate_reinstalls_dropped_triggers(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('The index is maintained on SQLite only')
+        # As SQLite does when a migration remakes the table
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER tasks_task_fts_task_insert')
+        create_test_task(title="Milk again", author=self.user)
+        self.assertEqual(len(self.search('milk')), 3)
+
+        install_search_index(using='default', verbosity=0)
+        with connection.cursor() as cursor:
+            self.assertTrue(SQLiteSearchBackend.is_installed(cursor))
+        self.assertEqual(len(self.search('milk')), 4)
+
+    def test_pages(self):
+        first = search_tasks(self.user, 'milk', page=1, per_page=2)
+        second = search_tasks(self.user, 'milk', page=2, per_page=2)
+        self.assertTrue(first.has_next)
+        self.assertFalse(second.has_next)
+        self.assertCountEqual(
+            list(first) + list(second),
+            [self.own, self.commented, self.shared]
+        )
+
+    @override_settings(
+        TASKS_SEARCH_BACKEND='tasks.search.DatabaseSearchBackend'
+    )
+    def test_database_backend(self):
+        self.assertCountEqual(
+            self.search('milk'), [self.own, self.commented, self.shared]
+        )
+        self.assertEqual(self.search('milk corner'), [self.own])
+
+
+class TaskSearchViewTest(TestCase):
+    def setUp(self):
+        self.user = user_model.objects.create(username='testuser')
+        self.client.force_login(self.user)
+        create_test_task(title="Buy milk", author=self.user)
+
+    def test_search(self):
+        response = self.client.get(reverse('tasks:search'), {'q': 'milk'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Buy milk")
+
+    def test_nothing_found(self):
+        response = self.client.get(reverse('tasks:search'), {'q': 'bread'})
+        self.assertContains(response, "Nothing found")
+
+    def test_invalid_page(self):
+        response = self.client.get(
+            reverse('tasks:search'), {'q': 'milk', 'page': 'x'}
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class ExplainQueriesCommandTest(TestCase):
+    def test_hot_queries_use_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Plan checks are written for SQLite')
+        out = io.StringIO()
+        call_command('explain_queries', '--strict', stdout=out)
+        self.assertIn('tasks.done_page', out.getvalue())
+        self.assertIn('friendships.friends', out.getvalue())
+
+    def test_hot_queries_match_views(self):
+        user = user_model.objects.create(username='testuser')
+        for i in range(3):
+            create_test_task(title=f'Task {i}', author=user)
+        self.client.force_login(user)
+        response = self.client.get(reverse('tasks:index'))
+        self.assertEqual(
+            list(response.context['active_tasks']),
+            list(HOT_QUERIES['tasks.active_page'](user.pk))
+        )
+
+
 class TaskShareModelTest(TestCase):
     def setUp(self):
         user_model = get_user_model()
@@ -555,3 +1488,219 @@ class TestUtils(SimpleTestCase):
     def test_get_tzname_by_ip(self):
         test_ip = '58.171.216.130'
         self.assertEqual(get_tzname_by_ip(test_ip), 'Australia/Sydney')
+
+
+class IPTimezoneTableTest(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.source = os.path.join(self.tmpdir.name, 'ranges.csv')
+        self.path = os.path.join(self.tmpdir.name, 'iptz.bin')
+        with open(self.source, 'w') as file:
+            file.write(
+                'first_ip,last_ip,timezone\n'
+                '58.160.0.0,58.175.255.255,Australia/Sydney\n'
+                '2.16.0.0,2.16.255.255,Europe/Paris\n'
+                '2.17.0.0,2.17.0.255,Europe/Paris\n'
+                '2001:4860::,2001:4860:ffff:ffff:ffff:ffff:ffff:ffff,'
+                'America/Los_Angeles\n'
+            )
+        call_command(
+            'build_iptz_table', self.source, self.path, stdout=io.StringIO()
+        )
+        self.table = IPTimezoneTable(self.path)
+        self.addCleanup(self.table.close)
+        get_tzname_from_table.cache_clear()
+        self.addCleanup(get_tzname_from_table.cache_clear)
+
+    def test_lookup(self):
+        self.assertEqual(self.table.lookup('58.171.216.130'), 'Australia/Sydney')
+        self.assertEqual(self.table.lookup('58.160.0.0'), 'Australia/Sydney')
+        self.assertEqual(self.table.lookup('58.175.255.255'), 'Australia/Sydney')
+        self.assertEqual(self.table.lookup('2.17.0.1'), 'Europe/Paris')
+        self.assertEqual(
+            self.table.lookup('2001:4860:4860::8888'), 'America/Los_Angeles'
+        )
+
+    def test_unknown_addresses(self):
+        for ip in ('1.1.1.1', '2.17.1.0', '58.176.0.0', '255.255.255.255', '::'):
+            self.assertIsNone(self.table.lookup(ip))
+
+    def test_invalid_file(self):
+        with open(self.path, 'r+b') as file:
+            file.write(b'NOTATABLE')
+        with self.assertRaises(InvalidTable):
+            IPTimezoneTable(self.path)
+
+    def test_overlapping_ranges(self):
+        with open(self.source, 'a') as file:
+            file.write('58.171.0.0,58.171.0.255,Australia/Perth\n')
+        with self.assertRaises(CommandError):
+            call_command('build_iptz_table', self.source, self.path)
+        # The previous table is kept
+        self.assertEqual(
+            IPTimezoneTable(self.path).lookup('58.171.0.1'), 'Australia/Sydney'
+        )
+
+    def test_reversed_range(self):
+        with open(self.source, 'a') as file:
+            file.write('3.0.0.255,3.0.0.0,Europe/Paris\n')
+        with self.assertRaisesMessage(CommandError, 'ends before it starts'):
+            call_command('build_iptz_table', self.source, self.path)
+
+    def test_failed_load_is_not_retried(self):
+        missing = os.path.join(self.tmpdir.name, 'missing.bin')
+        self.addCleanup(setattr, iptz, '_table', None)
+        with override_settings(IPTZ_TABLE_PATH=missing):
+            with self.assertLogs('tasks.iptz', 'ERROR'):
+                self.assertIsNone(iptz.get_table())
+            with mock.patch.object(iptz, 'IPTimezoneTable') as table:
+                self.assertIsNone(iptz.get_table())
+            table.assert_not_called()
+
+            os.replace(self.path, missing)
+            with override_settings(IPTZ_FAILURE_CACHE_TIMEOUT=0):
+                self.assertEqual(
+                    iptz.get_table().lookup('2.17.0.1'), 'Europe/Paris'
+                )
+            iptz.get_table().close()
+
+    def test_resolve_tzname_uses_table(self):
+        with override_settings(
+            IPTZ_TABLE_PATH=self.path, IPTZ_HTTP_FALLBACK=False
+        ):
+            self.assertEqual(resolve_tzname('58.171.216.130'), 'Australia/Sydney')
+            self.assertIsNone(resolve_tzname('1.1.1.1'))
+            self.assertIsNone(resolve_tzname('127.0.0.1'))
+            self.assertIsNone(resolve_tzname('not an ip'))
+
+    def test_middleware_activates_timezone(self):
+        factory = RequestFactory()
+        request = factory.get('/', REMOTE_ADDR='58.171.216.130')
+        request.session = {}
+        request.user = AnonymousUser()
+        seen = []
+
+        def get_response(request):
+            seen.append(timezone.get_current_timezone_name())
+
+        with override_settings(
+            IPTZ_TABLE_PATH=self.path, IPTZ_HTTP_FALLBACK=False
+        ):
+            UserTimezoneMiddleware(get_response)(request)
+        timezone.deactivate()
+        self.assertEqual(seen, ['Australia/Sydney'])
+        self.assertEqual(request.session['user_timezone'], 'Australia/Sydney')
+
+
+@override_settings(IPTZ_TABLE_PATH=None, IPTZ_HTTP_FALLBACK=True)
+class TimezoneDetectionTest(SimpleTestCase):
+    ip = '58.171.216.130'
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        get_tzname_from_table.cache_clear()
+        self.delay = mock.patch.object(resolve_ip_timezone, 'delay').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def request(self):
+        request = RequestFactory().get('/', REMOTE_ADDR=self.ip)
+        request.session = {}
+        request.user = AnonymousUser()
+        seen = []
+
+        def get_response(request):
+            seen.append(timezone.get_current_timezone_name())
+
+        UserTimezoneMiddleware(get_response)(request)
+        timezone.deactivate()
+        return seen[0], request.session
+
+    def test_lookup_is_scheduled_once(self):
+        for _ in range(3):
+            tzname, session = self.request()
+            self.assertEqual(tzname, timezone.get_default_timezone_name())
+            self.assertNotIn('user_timezone', session)
+        self.delay.assert_called_once_with(self.ip)
+
+    def test_resolved_timezone_is_used(self):
+        self.request()
+        with mock.patch(
+            'tasks.utils.get_tzname_by_ip', return_value='Australia/Sydney'
+        ):
+            resolve_ip_timezone(self.ip)
+        tzname, session = self.request()
+        self.assertEqual(tzname, 'Australia/Sydney')
+        self.assertEqual(session['user_timezone'], 'Australia/Sydney')
+        self.delay.assert_called_once_with(self.ip)
+
+    def test_failures_are_cached(self):
+        with mock.patch(
+            'tasks.utils.get_tzname_by_ip',
+            side_effect=requests.ConnectionError
+        ):
+            self.assertIsNone(resolve_ip_timezone(self.ip))
+        with mock.patch(
+            'tasks.utils.get_tzname_by_ip', return_value='Not/A_Timezone'
+        ):
+            self.assertEqual(resolve_ip_timezone('1.1.1.1'), 'Not/A_Timezone')
+        for ip in (self.ip, '1.1.1.1'):
+            self.assertIsNone(detect_tzname(ip))
+        self.delay.assert_not_called()
+
+    def test_private_addresses_are_not_looked_up(self):
+        self.assertIsNone(detect_tzname('127.0.0.1'))
+        self.assertIsNone(detect_tzname('192.168.0.1'))
+        self.delay.assert_not_called()
+
+    def test_no_fallback(self):
+        with override_settings(IPTZ_HTTP_FALLBACK=False):
+            self.assertIsNone(detect_tzname(self.ip))
+        self.delay.assert_not_called()
+
+
+class UserTimezoneMiddlewareTest(TestCase):
+    def setUp(self):
+        self.user = user_model.objects.create(username='testuser')
+
+    def request(self, session=None):
+        request = RequestFactory().get('/', REMOTE_ADDR='127.0.0.1')
+        request.session = session if session is not None else {}
+        request.user = self.user
+        seen = []
+
+        def get_response(request):
+            seen.append(timezone.get_current_timezone_name())
+
+        UserTimezoneMiddleware(get_response)(request)
+        timezone.deactivate()
+        return seen[0]
+
+    def test_user_timezone_needs_no_queries(self):
+        self.user.timezone = 'Asia/Tokyo'
+        self.user.save()
+        with self.assertNumQueries(0):
+            tzname = self.request({'user_timezone': 'Europe/Paris'})
+        self.assertEqual(tzname, 'Asia/Tokyo')
+
+    def test_session_timezone_is_saved_on_user(self):
+        tzname = self.request({'user_timezone': 'Europe/Paris'})
+        self.assertEqual(tzname, 'Europe/Paris')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.timezone, 'Europe/Paris')
+
+    def test_unknown_timezone(self):
+        tzname = self.request()
+        self.assertEqual(tzname, timezone.get_default_timezone_name())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.timezone, '')
+
+    def test_invalid_session_timezone(self):
+        tzname = self.request({'user_timezone': 'Not/A_Timezone'})
+        self.assertEqual(tzname, timezone.get_default_timezone_name())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.timezone, '')
+
+    def test_timezones_are_cached_per_name(self):
+        self.assertIs(get_timezone('Europe/Paris'), get_timezone('Europe/Paris'))
@@ -1,12 +1,47 @@
 from django.urls import path
 
 from . import views
+from .models import Task
 
 
 app_name = 'tasks'
 urlpatterns = [
     path('', views.TaskIndexView.as_view(), name='index'),
+    path(
+        'active/',
+        views.TaskPageView.as_view(status=Task.Status.ACTIVE),
+        name='active_page'
+    ),
+    path(
+        'done/',
+        views.TaskPageView.as_view(status=Task.Status.DONE),
+        name='done_page'
+    ),
+    path(
+        'done/tab/',
+        views.TaskTabView.as_view(status=Task.Status.DONE),
+        name='done_tab'
+    ),
+    path(
+        'failed/',
+        views.TaskPageView.as_view(status=Task.Status.FAILED),
+        name='failed_page'
+    ),
+    path(
+        'failed/tab/',
+        views.TaskTabView.as_view(status=Task.Status.FAILED),
+        name='failed_tab'
+    ),
+    path('search/', views.TaskSearchView.as_view(), name='search'),
+    path(
+        'shared/',
+        views.TaskSharedPageView.as_view(),
+        name='shared_page'
+    ),
     path('new/', views.TaskCreateView.as_view(), name='create'),
+    path('bulk/', views.TaskBulkActionView.as_view(), name='bulk_action'),
+    path('export/', views.TaskExportView.as_view(), name='export'),
+    path('import/', views.TaskImportView.as_view(), name='import'),
     path('<int:pk>/edit/', views.TaskUpdateView.as_view(), name='update'),
     path('<int:pk>/delete/', views.TaskDeleteView.as_view(), name='delete'),
     path('<int:pk>/done/', views.TaskDoneView.as_view(), name='done'),
@@ -21,6 +56,11 @@ urlpatterns = [
         views.TaskShareCreateView.as_view(), 
         name='share_create'
     ),
+    path(
+        '<int:task_id>/shares/bulk/',
+        views.TaskShareBulkCreateView.as_view(),
+        name='share_bulk_create'
+    ),
     path(
         '<int:task_id>/notice/new/',
         views.TaskNotificationCreateView.as_view(),
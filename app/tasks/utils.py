@@ -1,6 +1,13 @@
+import ipaddress
+from functools import lru_cache
+
+import pytz
 import requests
 
 from django.conf import settings
+from django.core.cache import cache
+
+from .iptz import get_table
 
 
 def get_client_ip(request):
@@ -12,10 +19,77 @@ def get_client_ip(request):
     return ip
 
 
+@lru_cache(maxsize=None)
+def get_timezone(tzname):
+    """Return the tzinfo of an IANA timezone name, built once per name."""
+    return pytz.timezone(tzname)
+
+
 def get_tzname_by_ip(ip):
     api_key = settings.IPGEOLOCATION_API_KEY
     url = f'https://api.ipgeolocation.io/timezone?apiKey={api_key}&ip={ip}'
-    response = requests.get(url)
+    response = requests.get(url, timeout=settings.IPTZ_HTTP_TIMEOUT)
     response_json = response.json()
     return response_json['timezone']
 
+
+def is_public_ip(ip):
+    try:
+        return ipaddress.ip_address(ip).is_global
+    except ValueError:
+        return False
+
+
+@lru_cache(maxsize=4096)
+def get_tzname_from_table(ip):
+    table = get_table()
+    return table.lookup(ip) if table is not None else None
+
+
+def resolve_tzname(ip):
+    """Return the timezone name of ip, or None if it can't be told.
+
+    The local table at IPTZ_TABLE_PATH is searched first. The HTTP API is
+    only asked about public addresses the table doesn't know, and only if
+    IPTZ_HTTP_FALLBACK is on. Errors of the API are raised.
+    """
+    if not is_public_ip(ip):
+        return None
+    tzname = get_tzname_from_table(ip)
+    if tzname is None and settings.IPTZ_HTTP_FALLBACK:
+        tzname = get_tzname_by_ip(ip)
+    return tzname
+
+
+TZNAME_PENDING = '?'
+TZNAME_UNKNOWN = ''
+
+
+def get_tzname_cache_key(ip):
+    return f'tasks:tzname:{ip}'
+
+
+def detect_tzname(ip):
+    """Return the timezone name of ip without waiting on the network.
+
+    Addresses the local table doesn't know are resolved by the
+    resolve_ip_timezone task, which stores the result in the cache. None
+    is returned until it is there, and also for unresolvable addresses.
+    """
+    if not is_public_ip(ip):
+        return None
+    tzname = get_tzname_from_table(ip)
+    if tzname is not None or not settings.IPTZ_HTTP_FALLBACK:
+        return tzname
+
+    key = get_tzname_cache_key(ip)
+    tzname = cache.get(key)
+    if tzname is None:
+        # Only the first request of a burst schedules the lookup
+        if cache.add(key, TZNAME_PENDING, settings.IPTZ_PENDING_TIMEOUT):
+            from .tasks import resolve_ip_timezone
+            resolve_ip_timezone.delay(ip)
+        return None
+    if tzname in (TZNAME_PENDING, TZNAME_UNKNOWN):
+        return None
+    return tzname
@@ -2,10 +2,18 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db import IntegrityError
-from django.http import HttpResponseForbidden, HttpResponseRedirect
+from django.http import (
+    Http404,
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse
+)
 from django.shortcuts import get_object_or_404
 from django.urls import reverse, reverse_lazy
-from django.views.generic import ListView, TemplateView, View
+from django.utils import timezone
+from django.views.generic import FormView, ListView, TemplateView, View
 from django.views.generic.detail import (
     SingleObjectMixin,
     SingleObjectTemplateResponseMixin
@@ -19,7 +27,13 @@ from django.views.generic.edit import (
     UpdateView
 )
 
-from .forms import TaskShareForm
+from . import bulk, export, imports
+from .forms import (
+    TaskBulkActionForm,
+    TaskBulkShareForm,
+    TaskImportForm,
+    TaskShareForm
+)
 from notifications.views import NotificationBaseCreateView
 from .mixins import (
     UserPassesAnyTestMixin,
@@ -27,34 +41,110 @@ from .mixins import (
     UserIsTaskAuthorTestMixin,
     UserIsTaskShareToUserTestMixin,
 )
-from .models import Task, TaskNotification, TaskShare
+from .models import (
+    Task,
+    TaskNotification,
+    TaskQuerySet,
+    TaskShare,
+    TaskShareQuerySet
+)
+from .pagination import InvalidCursor, KeysetPaginator
+from .search import search_tasks
 
 
 user_model = get_user_model()
 
 
-class TaskIndexView(LoginRequiredMixin, TemplateView):
+class TaskPaginationMixin:
+    paginate_by = 24
+
+    def get_task_page(self, status, now, cursor=None):
+        tasks = Task.objects.filter(author=self.request.user).tab(status, now)
+        return self._get_page(tasks, TaskQuerySet.tab_ordering(status), cursor)
+
+    def get_shared_task_page(self, now, cursor=None):
+        shares = TaskShare.objects.inbox(self.request.user, now)
+        return self._get_page(shares, TaskShareQuerySet.inbox_ordering, cursor)
+
+    def _get_page(self, queryset, ordering, cursor):
+        paginator = KeysetPaginator(queryset, ordering, self.paginate_by)
+        try:
+            return paginator.get_page(cursor)
+        except InvalidCursor:
+            raise Http404("Invalid page cursor")
+
+
+class TaskIndexView(LoginRequiredMixin, TaskPaginationMixin, TemplateView):
     template_name = 'tasks/index.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        all_tasks = (
-            Task.objects.filter(author=self.request.user)
-            .order_by('-create_date')
+        # Done and failed tabs are fetched by TaskTabView when opened
+        now = timezone.now()
+        context['active_tasks'] = self.get_task_page(Task.Status.ACTIVE, now)
+        context['active_shared_tasks'] = self.get_shared_task_page(now)
+        if context['active_shared_tasks'].has_next:
+            context['active_shared_tasks_count'] = (
+                TaskShare.objects.inbox(self.request.user, now).count()
+            )
+        else:
+            context['active_shared_tasks_count'] = (
+                len(context['active_shared_tasks'])
+            )
+        return context
+
+
+class TaskPageView(LoginRequiredMixin, TaskPaginationMixin, TemplateView):
+    """Renders a single page of task cards for the "load more" buttons."""
+    status = None
+
+    def get_template_names(self):
+        return [f'tasks/{self.status}_task_page.html']
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['tasks'] = self.get_task_page(
+            self.status, timezone.now(), self.request.GET.get('cursor')
         )
-        context['active_tasks'] = [t for t in all_tasks if t.active]
-        context['done_tasks'] = (
-            Task.objects.filter(author=self.request.user, done=True)
-            .order_by('-done_date')
+        return context
+
+
+class TaskSharedPageView(
+    LoginRequiredMixin, TaskPaginationMixin, TemplateView
+):
+    """Renders a single page of the shared tasks inbox."""
+    template_name = 'tasks/shared_task_page.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['shared_tasks'] = self.get_shared_task_page(
+            timezone.now(), self.request.GET.get('cursor')
         )
-        context['failed_tasks'] = [t for t in all_tasks if t.failed]
-        shared_tasks = (
-            TaskShare.objects.filter(to_user=self.request.user)
-            .order_by('-task__create_date')
+        return context
+
+
+class TaskTabView(TaskPageView):
+    """Renders the content of a tab pane on its first opening."""
+
+    def get_template_names(self):
+        return [f'tasks/{self.status}_task_tab.html']
+
+
+class TaskSearchView(LoginRequiredMixin, TemplateView):
+    template_name = 'tasks/search.html'
+    paginate_by = 24
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '')
+        try:
+            page = max(int(self.request.GET.get('page', 1)), 1)
+        except ValueError:
+            raise Http404("Invalid page number")
+        context['query'] = query
+        context['tasks'] = search_tasks(
+            self.request.user, query, page, self.paginate_by
         )
-        context['active_shared_tasks'] = [
-            tsh for tsh in shared_tasks if tsh.active
-        ]
         return context
 
 
@@ -86,7 +176,6 @@ class TaskDoneView(
     def post(self, request, *args, **kwargs):
         task = self.get_object()
         task.complete()
-        task.save()
         return HttpResponseRedirect(reverse('tasks:index'))
 
 
@@ -127,22 +216,85 @@ class TaskRepeatView(
         return super().form_valid(form)
 
 
+class TaskBulkActionView(LoginRequiredMixin, FormView):
+    form_class = TaskBulkActionForm
+    http_method_names = ['post']
+    actions = {
+        'complete': bulk.complete_tasks,
+        'delete': bulk.delete_tasks,
+        'repeat': bulk.repeat_tasks,
+    }
+
+    def form_valid(self, form):
+        action = self.actions[form.cleaned_data['action']]
+        results = action(self.request.user, form.cleaned_data['ids'])
+        return JsonResponse({'results': results})
+
+    def form_invalid(self, form):
+        return JsonResponse({'errors': form.errors}, status=400)
+
+
+class TaskExportView(LoginRequiredMixin, View):
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in export.FORMATS:
+            return HttpResponseBadRequest(
+                f"Unknown export format: {export_format}"
+            )
+        compress = request.GET.get('gzip') in ('1', 'true')
+
+        tasks = Task.objects.filter(author=request.user)
+        filename = f'tasks.{export_format}'
+        if compress:
+            content_type = 'application/gzip'
+            filename += '.gz'
+        else:
+            content_type = export.FORMATS[export_format]
+
+        response = StreamingHttpResponse(
+            export.stream_export(
+                tasks, format=export_format, compress=compress
+            ),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class TaskImportView(LoginRequiredMixin, FormView):
+    form_class = TaskImportForm
+    template_name = 'tasks/import.html'
+
+    def form_valid(self, form):
+        report = imports.import_stream(
+            form.cleaned_data['file'].file,
+            self.request.user,
+            format=form.cleaned_data['format']
+        )
+        return self.render_to_response(
+            self.get_context_data(form=form, report=report)
+        )
+
+
 class TaskShareCreateView(
     LoginRequiredMixin,
     UserPassesAnyTestMixin(
         UserIsTaskAuthorTestMixin, UserIsInTaskSharesUsersTestMixin
     ),
     SingleObjectTemplateResponseMixin,
+    SingleObjectMixin,
     FormMixin,
     ProcessFormView
 ):
-    model = TaskShare
+    # The object of the view is the shared task
+    queryset = Task.objects.all()
+    pk_url_kwarg = 'task_id'
     form_class = TaskShareForm
     template_name = 'tasks/task_share_create.html'
     success_url = reverse_lazy('tasks:index')
 
     def get(self, request, *args, **kwargs):
-        get_object_or_404(Task, pk=self.kwargs.get('task_id'))
+        self.get_object()
         self.object = None
         return self.render_to_response(self.get_context_data())
 
@@ -155,7 +307,7 @@ class TaskShareCreateView(
             return self.form_invalid(form)
 
     def form_valid(self, form):
-        task = Task.objects.get(pk=self.kwargs.get('task_id'))
+        task = self.get_object()
         to_username = form.cleaned_data.get('to_username')
         comment = form.cleaned_data.get('comment')
 
@@ -182,8 +334,42 @@ class TaskShareCreateView(
         kwargs['user'] = self.request.user
         return kwargs
 
-    def get_object(self):
-        return Task.objects.get(pk=self.kwargs.get('task_id'))
+
+class TaskShareBulkCreateView(
+    LoginRequiredMixin,
+    UserPassesAnyTestMixin(
+        UserIsTaskAuthorTestMixin, UserIsInTaskSharesUsersTestMixin
+    ),
+    SingleObjectMixin,
+    FormView
+):
+    model = Task
+    pk_url_kwarg = 'task_id'
+    form_class = TaskBulkShareForm
+    template_name = 'tasks/task_share_bulk_create.html'
+    success_url = reverse_lazy('tasks:index')
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        return super().get(request, *args, **kwargs)
+
+    def post(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        return super().post(request, *args, **kwargs)
+
+    def form_valid(self, form):
+        bulk.share_task(
+            self.object,
+            self.request.user,
+            [friend.from_user_id for friend in form.cleaned_data['to_users']],
+            form.cleaned_data['comment']
+        )
+        return super().form_valid(form)
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
 
 
 class TaskShareListView(ListView):
@@ -206,8 +392,7 @@ class TaskShareDoneView(
 
     def post(self, request, *args, **kwargs):
         task_share = self.get_object()
-        task_share.done = True
-        task_share.save()
+        task_share.complete()
         return HttpResponseRedirect(self.get_success_url())
 
     def get_success_url(self):